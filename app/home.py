@@ -1,12 +1,20 @@
+import logging
+
 import streamlit as st
 import streamlit_nested_layout
-from PIL import Image
-import requests
-from io import BytesIO
-from dataclasses import dataclass, asdict
 
 from jumble import schemas
-from jumble.game import Game
+from jumble.database import start_pool_stats_logging
+from jumble.game import (ExclusionSet, Game, GameState, prefetch_game,
+                         release_prefetched_game)
+from jumble.images import image_cache
+
+logger = logging.getLogger(__name__)
+# jumble logs, e.g. the db pool usage, go to the server output
+logging.basicConfig(level=logging.INFO)
+
+# pool usage is logged for monitoring, once per process
+start_pool_stats_logging()
 
 st.set_page_config(
     page_title="Joanimble",
@@ -21,16 +29,6 @@ COLOR_DICT = {
 }
 
 
-class Dict2Class(object):
-    """Helper class to convert dict to class object"""
-    def __init__(self, my_dict: dict):
-        for key in my_dict:
-            setattr(self, key, my_dict[key])
-
-    def to_dict(self):
-        return {key: value for key, value in self.__dict__.items()}
-
-
 # Initialization of master word
 if 'saved_game' not in st.session_state:
     st.session_state['saved_game'] = None
@@ -40,7 +38,8 @@ if 'saved_difficulty' not in st.session_state:
     st.session_state['saved_difficulty'] = None
 
 if 'to_exlude' not in st.session_state:
-    st.session_state['to_exlude'] = []
+    # ids of the games played, as a bitmap
+    st.session_state['to_exlude'] = ExclusionSet()
 
 if "reload" not in st.session_state:
     st.session_state['reload'] = False
@@ -51,40 +50,71 @@ def reset_values():
     st.session_state['saved_game'] = None
 
 
+def pop_prefetched_game():
+    """Get the game prefetched for this round, None if not ready"""
+    prefetched = st.session_state.pop('next_game', None)
+    if prefetched is None:
+        return None
+    level, future = prefetched
+    if level != difficulty_level or not future.done():
+        # not played, leave it to another player
+        release_prefetched_game(future)
+        return None
+    if future.exception() is not None:
+        logger.error("Failed to prefetch the next game", exc_info=future.exception())
+        return None
+    return future.result()
+
+
+def prefetch_next_game(game_id):
+    """Prefetch the next round while the current one is played"""
+    if 'next_game' in st.session_state or game_id is None:
+        return
+    # copy, as the prefetch runs in the background
+    to_exclude = st.session_state['to_exlude'].copy()
+    to_exclude.add(game_id)
+    st.session_state['next_game'] = (
+        difficulty_level,
+        prefetch_game(
+            difficulty_level=schemas.DifficultyLevel(difficulty_level),
+            to_exclude=to_exclude,
+            use_snapshots=True
+            )
+        )
+
+
 def load_game():
-    if st.session_state['saved_game'] is None:
+    """Get the state of the game to play and its content, read once per rerun"""
+    state = st.session_state['saved_game']
+    if state is not None:
+        # load game from saved game state
+        game = state.load()
+        if game.game_id is not None or state.game_id is None:
+            return state, game
+        # puzzle gone from the db, play another one
+
+    game = pop_prefetched_game()
+    if game is None:
         game = Game(
             difficulty_level=schemas.DifficultyLevel(difficulty_level),
             # keep track of games to exclude
-            to_exclude=st.session_state['to_exlude']
+            to_exclude=st.session_state['to_exlude'],
+            # serve a precomputed game, see `jumble/materialize.py`
+            use_snapshots=True
             )
-    else:
-        # load game from saved game
-        game = Dict2Class(st.session_state['saved_game'])
-
-    return game
-
-
-def get_letter_status(input_letter, true_letter):
-    if input_letter == '':
-        return 'missing'
-    else:
-        if input_letter.lower() == true_letter.lower():
-            return 'correct'
-        else:
-            return 'wrong'
+    return GameState.from_game(game), game
 
 
-def highlight_letter(color):
-    st.markdown(
+def highlight_letter(color, container=st):
+    container.markdown(
         f"""<hr style="height:5px;border:none;color:{color};background-color:{color};" /> """,
         unsafe_allow_html=True
         )
 
 
 def load_image(url):
-    response = requests.get(url)
-    return Image.open(BytesIO(response.content))
+    # resized once, then served from memory or disk on reruns
+    return image_cache.get(url)
 
 
 def get_letter(idx, list_letters):
@@ -119,10 +149,13 @@ with st.sidebar:
 
 
 # define the game to play
-game = load_game()
+state, game = load_game()
+
+# save in st.session_state, puzzle content stays in the shared catalog
+st.session_state['saved_game'] = state
 
-# save in st.session_state
-st.session_state['saved_game'] = game.to_dict()
+# get the next round ready
+prefetch_next_game(game.game_id)
 
 
 if game.game_id is None:
@@ -162,8 +195,9 @@ else:
             key='jumbles-form',
             )
 
-        # list to store correct letters
-        correct_letters = []
+        # submitted letters and highlight of the circled cells, per jumble
+        grid = {}
+        highlights = {}
 
         with form_jumbles:
             # get the max column number based on lenght of jumbles
@@ -179,6 +213,8 @@ else:
                     )
                 # display letters to fill
                 inner_cols = st.columns([1]*max_inner_cols)
+                grid[jumble_id] = []
+                highlights[jumble_id] = []
                 for i, letter in enumerate(data['placeholder']):
                     inner_col = inner_cols[i]
                     with inner_col:
@@ -188,15 +224,9 @@ else:
                             key=f"{jumble_id}_{i}",
                             max_chars=1,
                             )
-                        letter_status = get_letter_status(
-                            input_letter=input_letter,
-                            true_letter=data['solution'][i]
-                            )
-                        if letter != '?':
-                            highlight_letter(COLOR_DICT[letter_status])
-                            if letter_status == "correct":
-                                # add to correct letters
-                                correct_letters.append(input_letter)
+                        grid[jumble_id].append(input_letter)
+                        # filled once the whole grid is checked
+                        highlights[jumble_id].append(st.empty() if letter != '?' else None)
 
             st.write('#')
             submit = st.form_submit_button(
@@ -254,6 +284,14 @@ else:
 
             submit_solution = form_solution.form_submit_button('Submit!')
 
+        # check the whole grid and the answer at once
+        check = state.check_grid(grid, solution_parts=user_solution, game=game)
+        for jumble_id, statuses in check.jumbles.items():
+            for highlight, letter_status in zip(highlights[jumble_id], statuses):
+                if highlight is not None:
+                    highlight_letter(COLOR_DICT[letter_status], container=highlight)
+        correct_letters = check.circled_letters
+
         # display recap. of correclty found letters
         st.write("My correctly guessed letters: ")
         placeholder_letters = len(game.solution.replace(' ', ''))
@@ -271,16 +309,12 @@ else:
 
         if submit_solution:
             # check submission against solution
-            user_solution = ' '.join([t.strip().lower() for t in user_solution])
-
-            if user_solution == game.solution.lower():
+            if check.solution:
                 st.balloons()
                 st.success('You rock!', icon='🙌')
                 # update game id
                 # save this party as done
-                saved_games = st.session_state['to_exlude']
-                saved_games.append(game.game_id)
-                st.session_state['to_exlude'] = list(set(saved_games))
+                st.session_state['to_exlude'].add(game.game_id)
                 # option to reload
                 play_again = st.button(
                     label='Another round ?',
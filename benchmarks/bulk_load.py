@@ -0,0 +1,99 @@
+"""
+Benchmark of the populator insert paths on a synthetic dataset.
+
+Master words, with their jumbles and jumble options, are inserted in a
+throwaway SQLite db, once with the ORM path, one master word per transaction,
+and once with the batched bulk path. Run from the repo root with
+`PYTHONPATH=. python benchmarks/bulk_load.py`.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from typing import Callable, Tuple
+
+import pandas as pd
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from jumble import models, populator
+
+N_OPTIONS = 100_000
+N_JUMBLES = 4
+N_OPTIONS_PER_JUMBLE = 5
+LEVELS = ['Walk in the park', 'Wee bit of a challenge', 'Difficult']
+
+
+def make_dataset(n_options: int) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Synthetic master words and options, with as many options per jumble"""
+    n_masters = max(n_options // (N_JUMBLES * N_OPTIONS_PER_JUMBLE), 1)
+    df_masters = pd.DataFrame({
+        'id': range(1, n_masters + 1),
+        'to_complete': [f'clue {i} ---' for i in range(n_masters)],
+        'solution': [f'solution {i}' for i in range(n_masters)],
+        'dialogue': 'Character 1: "..."',
+        'image_url': 'https://example.com/image.png'
+        })
+    records = [
+        {
+            'word': f'word{i}x{j}x{k}',
+            'score': k,
+            'defs': f'n\tdefinition of word {i} {j} {k}',
+            'defHeadword': None,
+            'level': LEVELS[k % len(LEVELS)],
+            'placeholder': '?o??',
+            'hint': j,
+            'master_id': i
+        }
+        for i in df_masters['id']
+        for j in range(1, N_JUMBLES + 1)
+        for k in range(N_OPTIONS_PER_JUMBLE)
+        ]
+    return df_masters, pd.DataFrame(records)
+
+
+def count_rows(db: Session) -> int:
+    return sum(
+        db.execute(select(func.count()).select_from(t)).scalar_one()
+        for t in (models.MasterWord, models.Jumble, models.JumbleOption)
+        )
+
+
+def time_load(
+    load: Callable[[pd.DataFrame, pd.DataFrame, Session], list],
+    df_masters: pd.DataFrame, df_options: pd.DataFrame, tmp_dir: str
+    ) -> Tuple[int, float]:
+    """Number of rows inserted in a fresh db, and the time it took in seconds"""
+    path = os.path.join(tmp_dir, f'{load.__name__}.db')
+    engine = create_engine(f"sqlite:///{path}")
+    models.Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        start = time.perf_counter()
+        load(df_masters=df_masters, df_options=df_options, db=db)
+        elapsed = time.perf_counter() - start
+        n_rows = count_rows(db)
+    engine.dispose()
+    return n_rows, elapsed
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--options', type=int, default=N_OPTIONS)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    df_masters, df_options = make_dataset(args.options)
+    print(f'{len(df_masters):,} master words, {len(df_options):,} options')
+
+    def bulk_create_master_words(**kwargs):
+        return populator.bulk_create_master_words(**kwargs, batch_size=args.batch_size)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for load in (populator.create_master_words, bulk_create_master_words):
+            n_rows, elapsed = time_load(load, df_masters, df_options, tmp_dir=tmp_dir)
+            print(
+                f'{load.__name__:<26} {n_rows:>9,} rows {elapsed:8.2f} s '
+                f'{n_rows / elapsed:>10,.0f} rows/s'
+                )
@@ -0,0 +1,90 @@
+"""
+Benchmark of the hints accumulation against the number of puns.
+
+Each pun's hints are generated by a stub returning a synthetic frame, so that
+only the pipeline is timed: the sanitizing of the definitions, then either a
+`pd.concat` of all prior rows inside the loop, as the generator used to, or
+the frames materialized once at the end by `generator.generate_all_hints`.
+Peak memory is traced with `tracemalloc`. Run from the repo root with
+`PYTHONPATH=. python benchmarks/generate_hints.py`.
+"""
+
+import argparse
+import logging
+import time
+import tracemalloc
+from typing import Callable, Tuple
+from unittest import mock
+
+import pandas as pd
+
+from jumble import generator
+
+SIZES = [1_000, 2_500, 5_000, 10_000]
+N_HINTS = 4
+N_CANDIDATES = 25
+
+
+def get_pun_hints(pun: pd.Series, **kwargs) -> pd.DataFrame:
+    """
+    Synthetic hints of a pun, in the shape of `generator.get_pun_hints`. The
+    candidates of a hint share their definitions, so that sanitizing them
+    doesn't outweigh the rest of the pipeline
+    """
+    hints = [1 + i // N_CANDIDATES for i in range(N_HINTS * N_CANDIDATES)]
+    return pd.DataFrame({
+        'word': [f"{pun['solution']}x{t}" for t in hints],
+        'score': range(len(hints)),
+        'defs': [[f"n\tdefinition of hint {t} of {pun['solution']}"] for t in hints],
+        'level': pd.Categorical(
+            [generator.DIFFICULTY_LEVELS[i % 3] for i in range(len(hints))],
+            categories=generator.DIFFICULTY_LEVELS
+            ),
+        'placeholder': '?o??',
+        'hint': hints,
+        'master_id': pun['id']
+        })
+
+
+def concat_in_loop(df_puns: pd.DataFrame, **kwargs) -> pd.DataFrame:
+    """Previous accumulation, copying all prior rows for each pun"""
+    df_all_hints = pd.DataFrame()
+    for df_hints in generator.iter_all_hints(df_puns, **kwargs):
+        df_all_hints = pd.concat([df_all_hints, df_hints], axis=0)
+    return df_all_hints
+
+
+def time_run(
+    generate: Callable[..., pd.DataFrame], df_puns: pd.DataFrame, max_workers: int
+    ) -> Tuple[int, float, float]:
+    """Number of hints, time in seconds and peak memory in MB of a run"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    df_all_hints = generate(df_puns, max_workers=max_workers)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(df_all_hints), elapsed, peak / 2**20
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--max-workers', type=int, default=generator.MAX_WORKERS)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    with mock.patch.object(generator, 'get_pun_hints', get_pun_hints), \
+            mock.patch.object(generator, 'tqdm', lambda x, **kwargs: x):
+        for size in sorted(args.sizes):
+            df_puns = pd.DataFrame({
+                'id': range(1, size + 1),
+                'solution': [f'pun{i}' for i in range(size)]
+                })
+            for generate in (concat_in_loop, generator.generate_all_hints):
+                n_hints, elapsed, peak = time_run(generate, df_puns, max_workers=args.max_workers)
+                print(
+                    f'{size:>7,} puns  {generate.__name__:<20} {n_hints:>8,} hints '
+                    f'{elapsed:7.2f} s {elapsed / size * 1e6:8.0f} us/pun {peak:8.1f} MB peak'
+                    )
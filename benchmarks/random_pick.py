@@ -0,0 +1,82 @@
+"""
+Benchmark of the random master word pick strategies against the catalog size.
+
+Master words are inserted in a throwaway SQLite db, growing it from 1k to 1M
+rows, and each strategy picks random master words around a list of excluded
+ids. Run from the repo root with `PYTHONPATH=. python benchmarks/random_pick.py`.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from jumble import crud, models, schemas
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+N_EXCLUDED = 500
+
+
+def add_master_words(db: Session, start: int, stop: int, batch_size: int = 50_000):
+    for offset in range(start, stop, batch_size):
+        db.execute(insert(models.MasterWord), [
+            {
+                'to_complete': f'clue {i}',
+                'solution': f'solution {i}',
+                'dialogue': '',
+                'image_url': ''
+            }
+            for i in range(offset, min(offset + batch_size, stop))
+            ])
+    db.commit()
+
+
+def time_picks(
+    db: Session, strategy: schemas.RandomPickStrategy, exclude_ids: list,
+    n_picks: int, rng: random.Random
+    ) -> float:
+    """Median time of a pick in ms"""
+    timings = []
+    for _ in range(n_picks):
+        start = time.perf_counter()
+        master_word = crud.read_rnd_master_word(
+            db, exclude_ids=exclude_ids, strategy=strategy, rng=rng
+            )
+        timings.append(time.perf_counter() - start)
+        assert master_word.id not in exclude_ids
+        db.expunge_all()
+    return statistics.median(timings) * 1000
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--picks', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}")
+        models.Base.metadata.create_all(engine)
+
+        n_rows = 0
+        with Session(engine) as db:
+            for size in sorted(args.sizes):
+                add_master_words(db, start=n_rows, stop=size)
+                n_rows = size
+                exclude_ids = rng.sample(range(1, size + 1), min(N_EXCLUDED, size - 1))
+
+                for strategy in schemas.RandomPickStrategy:
+                    # sorting the whole table is only timed a few times
+                    n_picks = args.picks
+                    if strategy == schemas.RandomPickStrategy.order_by_random:
+                        n_picks = max(args.picks * 1000 // size, 5)
+                    ms = time_picks(db, strategy, exclude_ids, n_picks=n_picks, rng=rng)
+                    print(f'{size:>9,} master words  {strategy.value:<16} {ms:8.3f} ms')
+        engine.dispose()
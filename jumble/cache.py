@@ -0,0 +1,152 @@
+"""
+In-process read-through cache for the puzzle catalog.
+
+Master words, jumbles and jumble options only change when
+`jumble/populator.py` is run, so once loaded they can be served from memory
+without touching the db. The populator runs in its own process, running apps
+pick up the new master words once their cached ids expire after `CACHE_TTL`.
+"""
+
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from jumble import crud, schemas
+from jumble.database import SessionLocal
+
+CACHE_MAX_SIZE = 1024
+CACHE_TTL = 3600.0
+MAX_RND_PICKS = 16
+
+
+class LRUCache:
+    """Bounded LRU mapping whose entries expire after `ttl` seconds"""
+
+    def __init__(self, max_size: int = CACHE_MAX_SIZE, ttl: float = CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a value from the cache, `default` if missing or expired"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            # mark as most recently used
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        """Store a value in the cache, evicting the least recently used ones"""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class PuzzleCatalog:
+    """Read-through cache in front of `jumble.crud` for the puzzle content"""
+
+    _IDS_KEY = 'master_word_ids'
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        max_size: int = CACHE_MAX_SIZE,
+        ttl: float = CACHE_TTL
+    ):
+        self.session_factory = session_factory
+        self._cache = LRUCache(max_size=max_size, ttl=ttl)
+
+    def master_word_ids(self) -> List[int]:
+        """Get the ids of all master words"""
+        ids = self._cache.get(self._IDS_KEY)
+        if ids is None:
+            with self.session_factory() as db:
+                ids = tuple(crud.read_master_word_ids(db))
+            self._cache.set(self._IDS_KEY, ids)
+        return ids
+
+    def peek_master_word_ids(self) -> Optional[List[int]]:
+        """Get the cached ids of all master words, None if not cached, without reading the db"""
+        return self._cache.get(self._IDS_KEY)
+
+    def add_master_word_ids(self, ids: List[int]):
+        """Cache the ids of all master words read elsewhere, e.g. with the async engine"""
+        self._cache.set(self._IDS_KEY, tuple(ids))
+
+    def read_master_word(
+        self, master_word_id: int, level: schemas.DifficultyLevel
+    ) -> Optional[schemas.MasterWordPuzzle]:
+        """Get a master word with its jumbles and options at the difficulty level"""
+        key = (master_word_id, level)
+        puzzle = self._cache.get(key)
+        if puzzle is None:
+            with self.session_factory() as db:
+                master_word = crud.read_master_word_with_options(
+                    db, master_word_id=master_word_id, level=level
+                    )
+                if master_word is None:
+                    return None
+                puzzle = schemas.MasterWordPuzzle.from_orm(master_word)
+            self._cache.set(key, puzzle)
+        return puzzle
+
+    def peek_master_word(
+        self, master_word_id: int, level: schemas.DifficultyLevel
+    ) -> Optional[schemas.MasterWordPuzzle]:
+        """Get a cached master word, None if not cached, without reading the db"""
+        return self._cache.get((master_word_id, level))
+
+    def add_master_word(
+        self, puzzle: schemas.MasterWordPuzzle, level: schemas.DifficultyLevel
+    ):
+        """Cache a master word read elsewhere, e.g. with the async engine"""
+        self._cache.set((puzzle.id, level), puzzle)
+
+    def read_rnd_master_word(
+        self, exclude_ids: List[int], level: schemas.DifficultyLevel,
+        rng: Optional[random.Random] = None
+    ) -> Optional[schemas.MasterWordPuzzle]:
+        """Get a random master word not in list of ids"""
+        rng = random if rng is None else rng
+        ids = self.master_word_ids()
+        exclude_ids = set(exclude_ids)
+
+        # a few random draws are enough unless most ids are excluded
+        for _ in range(MAX_RND_PICKS if ids else 0):
+            master_word_id = rng.choice(ids)
+            if master_word_id not in exclude_ids:
+                return self.read_master_word(master_word_id, level=level)
+
+        candidates = [t for t in ids if t not in exclude_ids]
+        if len(candidates) == 0:
+            return None
+        return self.read_master_word(rng.choice(candidates), level=level)
+
+    def invalidate(self):
+        """Drop all cached content"""
+        self._cache.clear()
+
+
+# shared catalog for the running process
+catalog = PuzzleCatalog()
@@ -1,9 +1,13 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func, select
+from sqlalchemy.orm import Query, Session, aliased, joinedload
+from sqlalchemy import delete, func, insert, select
 
-from typing import List
+import random
+from typing import Collection, Dict, List, Optional, Set, Tuple
 from jumble import models, schemas
 
+# random ids looked up before scanning the id range for an allowed one
+MAX_RND_PIVOTS = 8
+
 
 ####### Master word section #######
 
@@ -14,11 +18,126 @@ def read_master_word(db: Session, master_word_id: int) -> models.MasterWord:
         ).first()
 
 
-def read_rnd_master_word(db: Session, exclude_ids: List[int]) -> models.MasterWord:
+def read_master_word_id_bounds(
+    db: Session
+    ) -> Tuple[Optional[int], Optional[int]]:
+    """Function should return the min and max master word ids"""
+    # separate subqueries so that each aggregate is answered from the index
+    return db.query(
+        select(func.min(models.MasterWord.id)).scalar_subquery(),
+        select(func.max(models.MasterWord.id)).scalar_subquery()
+        ).one()
+
+
+def _pick_rnd_master_word(
+    db: Session, query: Query, exclude_ids: Collection[int],
+    strategy: schemas.RandomPickStrategy,
+    rng: Optional[random.Random] = None
+    ) -> models.MasterWord:
+    """
+    Pick a random master word from query, never returning an excluded id.
+
+    `id_range` draws random ids between the min and max ids, skipping the
+    excluded ones in process, and looks each one up by primary key until one
+    exists. Every allowed id is equally likely, and the excluded ids are only
+    sent to the db if `MAX_RND_PIVOTS` draws all missed, in which case the
+    first allowed id at or after the last draw is returned.
+    `order_by_random` sorts the whole table on every call, and being random
+    on the db side it ignores `rng`.
+    """
+    if strategy == schemas.RandomPickStrategy.order_by_random:
+        return query.filter(
+            ~models.MasterWord.id.in_(list(exclude_ids))
+            ).order_by(func.random()).first()
+
+    min_id, max_id = read_master_word_id_bounds(db)
+    if min_id is None:
+        # empty table
+        return None
+    rng = random if rng is None else rng
+    excluded = set(exclude_ids)
+
+    for _ in range(MAX_RND_PIVOTS):
+        pivot = rng.randint(min_id, max_id)
+        if pivot in excluded:
+            continue
+        master_word = query.filter(models.MasterWord.id == pivot).first()
+        if master_word is not None:
+            return master_word
+
+    # mostly excluded ids or gaps, scan from the last draw
+    query = query.filter(~models.MasterWord.id.in_(list(excluded)))
+    master_word = query.filter(
+        models.MasterWord.id >= pivot
+        ).order_by(models.MasterWord.id).first()
+    if master_word is None:
+        # wrap around to the start of the id range
+        master_word = query.filter(
+            models.MasterWord.id < pivot
+            ).order_by(models.MasterWord.id).first()
+    return master_word
+
+
+def read_rnd_master_word(
+    db: Session, exclude_ids: List[int],
+    strategy: schemas.RandomPickStrategy = schemas.RandomPickStrategy.id_range,
+    rng: Optional[random.Random] = None
+    ) -> models.MasterWord:
     """Function should query the db for a random master word not in list of ids"""
-    return db.query(models.MasterWord).filter(
-        ~models.MasterWord.id.in_(exclude_ids)
-        ).order_by(func.random()).first()
+    return _pick_rnd_master_word(
+        db, query=db.query(models.MasterWord),
+        exclude_ids=exclude_ids, strategy=strategy, rng=rng
+        )
+
+
+def _jumbles_with_level_options(level: schemas.DifficultyLevel):
+    """
+    Loader option eager loading the jumbles of a master word along with
+    only their jumble options matching the difficulty level
+    """
+    return joinedload(models.MasterWord.jumbles).selectinload(
+        models.Jumble.jumble_options.and_(
+            models.JumbleOption.level == level.value
+            )
+        )
+
+
+def read_rnd_master_word_with_options(
+    db: Session, exclude_ids: List[int], level: schemas.DifficultyLevel,
+    strategy: schemas.RandomPickStrategy = schemas.RandomPickStrategy.id_range,
+    rng: Optional[random.Random] = None
+    ) -> models.MasterWord:
+    """
+    Function should query the db for a random master word not in list of ids,
+    eager loading its jumbles and the jumble options at the difficulty level
+    """
+    return _pick_rnd_master_word(
+        db, query=db.query(models.MasterWord).options(
+            _jumbles_with_level_options(level)
+            ),
+        exclude_ids=exclude_ids, strategy=strategy, rng=rng
+        )
+
+
+def read_master_word_with_options(
+    db: Session, master_word_id: int, level: schemas.DifficultyLevel
+    ) -> models.MasterWord:
+    """
+    Function should query the db for the master word matching id, eager
+    loading its jumbles and the jumble options at the difficulty level
+    """
+    return db.query(models.MasterWord).options(
+        _jumbles_with_level_options(level)
+        ).filter(
+        models.MasterWord.id == master_word_id
+        ).first()
+
+
+def read_master_word_ids(db: Session) -> List[int]:
+    """Function should return the ids of all master words"""
+    return db.execute(
+        select(models.MasterWord.id).order_by(models.MasterWord.id)
+        ).scalars().all()
 
 
 def read_master_words(
@@ -36,12 +155,41 @@ def read_master_word_by_solution(db: Session, solution: str) -> models.MasterWor
 
 
 def read_master_words_by_solutions(
-    db: Session, solutions: List[str]
-    ) -> models.MasterWord:
-    """Function should query the db for the master word with a matching solutions"""
-    return db.query(models.MasterWord).filter(
-        models.MasterWord.solution in solutions
-        ).all()
+    db: Session, solutions: List[str], chunk_size: int = 1000
+    ) -> List[models.MasterWord]:
+    """
+    Function should query the db for the master words with a matching solutions,
+    chunking the IN clause to stay below the driver's bound parameters limit
+    """
+    solutions = list(set(solutions))
+    master_words = []
+    for start in range(0, len(solutions), chunk_size):
+        master_words.extend(
+            db.query(models.MasterWord).filter(
+                models.MasterWord.solution.in_(solutions[start:start + chunk_size])
+                ).all()
+            )
+    return master_words
+
+
+def read_existing_solutions(
+    db: Session, solutions: List[str], chunk_size: int = 1000
+    ) -> Set[str]:
+    """
+    Function should return the subset of solutions already in the db, using
+    chunked IN lookups against the master_words.solution index
+    """
+    solutions = list(set(solutions))
+    existing = set()
+    for start in range(0, len(solutions), chunk_size):
+        existing.update(
+            db.execute(
+                select(models.MasterWord.solution).where(
+                    models.MasterWord.solution.in_(solutions[start:start + chunk_size])
+                    )
+                ).scalars()
+            )
+    return existing
 
 
 def create_master_word_orm(
@@ -64,6 +212,66 @@ def create_master_word(
     return create_master_word_orm(db=db, new_master_word=new_master_word)
 
 
+def bulk_create_master_words(
+    db: Session, master_words: List[dict], batch_size: int = 500
+    ) -> List[int]:
+    """
+    Function to bulk insert master words with their jumbles and options.
+
+    Each master word is a dict of its columns plus a `jumbles` key holding a
+    list of jumbles, each one being a list of jumble option dicts. Rows are
+    inserted with one executemany statement per table and the transaction is
+    committed every `batch_size` master words. Returns the ids of the new
+    master words, in input order.
+    """
+    master_word_ids = []
+    for start in range(0, len(master_words), batch_size):
+        batch = master_words[start:start + batch_size]
+
+        # insert master words and get back their ids from the unique clue
+        db.execute(
+            insert(models.MasterWord),
+            [{k: v for k, v in t.items() if k != 'jumbles'} for t in batch]
+            )
+        ids_by_clue = dict(db.execute(
+            select(models.MasterWord.to_complete, models.MasterWord.id).where(
+                models.MasterWord.to_complete.in_([t['to_complete'] for t in batch])
+                )
+            ).all())
+        batch_ids = [ids_by_clue[t['to_complete']] for t in batch]
+
+        # insert jumbles, their ids are read back in insertion order
+        jumbles = [
+            {'master_word_id': master_word_id}
+            for master_word_id, t in zip(batch_ids, batch)
+            for _ in t['jumbles']
+            ]
+        if len(jumbles) > 0:
+            db.execute(insert(models.Jumble), jumbles)
+        jumble_ids: Dict[int, List[int]] = {t: [] for t in batch_ids}
+        for jumble_id, master_word_id in db.execute(
+            select(models.Jumble.id, models.Jumble.master_word_id).where(
+                models.Jumble.master_word_id.in_(batch_ids)
+                ).order_by(models.Jumble.id)
+            ):
+            jumble_ids[master_word_id].append(jumble_id)
+
+        # insert jumble options
+        options = [
+            {**option, 'jumble_id': jumble_id}
+            for master_word_id, t in zip(batch_ids, batch)
+            for jumble_id, jumble in zip(jumble_ids[master_word_id], t['jumbles'])
+            for option in jumble
+            ]
+        if len(options) > 0:
+            db.execute(insert(models.JumbleOption), options)
+
+        db.commit()
+        master_word_ids.extend(batch_ids)
+
+    return master_word_ids
+
+
 ####### Jumbles section #######
 
 
@@ -140,34 +348,94 @@ def read_jumble_options(
     return jumble.jumble_options
 
 
+def read_rnd_jumble_options(
+    db: Session, jumble_ids: List[int], level: schemas.DifficultyLevel
+    ) -> List[models.JumbleOption]:
+    """
+    Get one random jumble option per jumble id at a difficulty level, picked
+    by the db using the (jumble_id, level) index
+    """
+    ranked = select(
+        models.JumbleOption,
+        func.row_number().over(
+            partition_by=models.JumbleOption.jumble_id,
+            order_by=func.random()
+            ).label('rank')
+        ).where(
+        models.JumbleOption.jumble_id.in_(jumble_ids),
+        models.JumbleOption.level == level.value
+        ).subquery()
+    jumble_option = aliased(models.JumbleOption, ranked)
+
+    return db.query(jumble_option).filter(ranked.c.rank == 1).all()
+
+
 def read_single_jumble_option(
     db: Session, jumble_id: int,
     level: schemas.DifficultyLevel,
-    order: str = schemas.JumbleOptionScoreSort
+    order: schemas.JumbleOptionScoreSort = schemas.JumbleOptionScoreSort.rdn
     ) -> models.JumbleOption:
     """
-    Get one random jumble option from a jumble id and difficulty level
+    Get one jumble option from a jumble id and difficulty level, either the
+    lowest score, the highest score or a random one
     """
-    # query the master word
-    jumble = read_jumble(db, jumble_id=jumble_id)
+    order_by = {
+        schemas.JumbleOptionScoreSort.score_asc: (
+            models.JumbleOption.score.asc(), models.JumbleOption.id
+            ),
+        schemas.JumbleOptionScoreSort.score_dsc: (
+            models.JumbleOption.score.desc(), models.JumbleOption.id
+            ),
+        schemas.JumbleOptionScoreSort.rdn: (func.random(), ),
+    }[order]
 
-    # make use of SQL Alchemy's sugar syntax
-    if jumble is None:
-        return None
+    # filter, sort and pick in the db
+    return db.query(models.JumbleOption).filter(
+        models.JumbleOption.jumble_id == jumble_id,
+        models.JumbleOption.level == level.value
+        ).order_by(*order_by).first()
 
-    # filter jumbles options
-    options = [
-        t for t in jumble.jumble_options
-        if t.level == level.value
-        ]
 
-    if order == schemas.JumbleOptionScoreSort.score_asc:
-        options = sorted(options, key= lambda x: x.score)
-    if order == schemas.JumbleOptionScoreSort.score_dsc:
-        options = sorted(options, key= lambda x: x.score, reverse=True)
-    else:
-        # random order
-        import random
-        random.shuffle(options)
+####### Game snapshots section #######
+
 
-    return options[0]
+def count_game_snapshots(db: Session, level: schemas.DifficultyLevel) -> int:
+    """Function should return the number of snapshots left at the difficulty level"""
+    return db.query(func.count(models.GameSnapshot.id)).filter(
+        models.GameSnapshot.level == level.value
+        ).scalar()
+
+
+def create_game_snapshots(db: Session, snapshots: List[dict]) -> int:
+    """
+    Function should bulk insert game snapshots, each one a dict with its
+    `master_word_id`, `level` and `payload`
+    """
+    if len(snapshots) == 0:
+        return 0
+    db.execute(insert(models.GameSnapshot), snapshots)
+    db.commit()
+    return len(snapshots)
+
+
+def take_game_snapshots(
+    db: Session, level: schemas.DifficultyLevel, n_snapshots: int
+    ) -> List[dict]:
+    """
+    Take up to `n_snapshots` of the oldest snapshots at the difficulty level
+    out of the table, and return their payloads. Rows locked by another
+    process are skipped, so that concurrent servers each get their own ones
+    """
+    snapshots = db.query(models.GameSnapshot).filter(
+        models.GameSnapshot.level == level.value
+        ).order_by(models.GameSnapshot.id).limit(n_snapshots).with_for_update(
+        skip_locked=True
+        ).all()
+    if len(snapshots) == 0:
+        return []
+
+    db.execute(delete(models.GameSnapshot).where(
+        models.GameSnapshot.id.in_([t.id for t in snapshots])
+        ))
+    db.commit()
+    return [t.payload for t in snapshots]
@@ -0,0 +1,108 @@
+"""
+Async counterparts of the `jumble.crud` reads used to create a game, to be
+run with an `AsyncSession` from `jumble.database.AsyncSessionLocal`.
+"""
+
+import random
+from typing import Collection, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+from jumble import models, schemas
+from jumble.crud import MAX_RND_PIVOTS, _jumbles_with_level_options
+
+
+####### Master word section #######
+
+async def read_master_word_id_bounds(db: AsyncSession):
+    """Function should return the min and max master word ids"""
+    # separate subqueries so that each aggregate is answered from the index
+    return (await db.execute(select(
+        select(func.min(models.MasterWord.id)).scalar_subquery(),
+        select(func.max(models.MasterWord.id)).scalar_subquery()
+        ))).one()
+
+
+async def _first(db: AsyncSession, stmt: Select) -> Optional[models.MasterWord]:
+    # joined eager loads of collections need unique rows
+    return (await db.execute(stmt.limit(1))).unique().scalars().first()
+
+
+async def _pick_rnd_master_word(
+    db: AsyncSession, stmt: Select, exclude_ids: Collection[int],
+    strategy: schemas.RandomPickStrategy,
+    rng: Optional[random.Random] = None
+    ) -> Optional[models.MasterWord]:
+    """Pick a random master word from statement, see `crud._pick_rnd_master_word`"""
+    if strategy == schemas.RandomPickStrategy.order_by_random:
+        return await _first(db, stmt.where(
+            ~models.MasterWord.id.in_(list(exclude_ids))
+            ).order_by(func.random()))
+
+    min_id, max_id = await read_master_word_id_bounds(db)
+    if min_id is None:
+        # empty table
+        return None
+    rng = random if rng is None else rng
+    excluded = set(exclude_ids)
+
+    for _ in range(MAX_RND_PIVOTS):
+        pivot = rng.randint(min_id, max_id)
+        if pivot in excluded:
+            continue
+        master_word = await _first(db, stmt.where(models.MasterWord.id == pivot))
+        if master_word is not None:
+            return master_word
+
+    # mostly excluded ids or gaps, scan from the last draw
+    stmt = stmt.where(~models.MasterWord.id.in_(list(excluded)))
+    master_word = await _first(db, stmt.where(
+        models.MasterWord.id >= pivot
+        ).order_by(models.MasterWord.id))
+    if master_word is None:
+        # wrap around to the start of the id range
+        master_word = await _first(db, stmt.where(
+            models.MasterWord.id < pivot
+            ).order_by(models.MasterWord.id))
+    return master_word
+
+
+async def read_rnd_master_word_with_options(
+    db: AsyncSession, exclude_ids: List[int], level: schemas.DifficultyLevel,
+    strategy: schemas.RandomPickStrategy = schemas.RandomPickStrategy.id_range,
+    rng: Optional[random.Random] = None
+    ) -> Optional[models.MasterWord]:
+    """
+    Function should query the db for a random master word not in list of ids,
+    eager loading its jumbles and the jumble options at the difficulty level
+    """
+    return await _pick_rnd_master_word(
+        db, stmt=select(models.MasterWord).options(
+            _jumbles_with_level_options(level)
+            ),
+        exclude_ids=exclude_ids, strategy=strategy, rng=rng
+        )
+
+
+async def read_master_word_with_options(
+    db: AsyncSession, master_word_id: int, level: schemas.DifficultyLevel
+    ) -> Optional[models.MasterWord]:
+    """
+    Function should query the db for the master word matching id, eager
+    loading its jumbles and the jumble options at the difficulty level
+    """
+    return await _first(db, select(models.MasterWord).options(
+        _jumbles_with_level_options(level)
+        ).where(
+        models.MasterWord.id == master_word_id
+        ))
+
+
+async def read_master_word_ids(db: AsyncSession) -> List[int]:
+    """Function should return the ids of all master words"""
+    return (await db.execute(
+        select(models.MasterWord.id).order_by(models.MasterWord.id)
+        )).scalars().all()
+
@@ -1,15 +1,233 @@
+import logging
 import os
+import threading
+import time
+from typing import Any, Callable, Optional
 from sqlalchemy import create_engine
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from sqlalchemy_utils import database_exists, create_database
 from sqlalchemy.orm import sessionmaker
 
-DB_URL = os.environ.get("POSTGRES_DATABASE_URL")
-engine = create_engine(DB_URL)
+# pool configuration, see `.env.sample`
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+# seconds before a connection is replaced, below the server idle timeout
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
+# seconds to wait for a connection from the pool
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+# milliseconds before a statement is cancelled by postgres, 0 to disable
+DB_STATEMENT_TIMEOUT = int(os.environ.get("DB_STATEMENT_TIMEOUT", 0))
+# seconds between two logs of the pool usage, 0 to disable
+DB_POOL_STATS_INTERVAL = float(os.environ.get("DB_POOL_STATS_INTERVAL", 300))
+
+logger = logging.getLogger(__name__)
+
+
+# async drivers used when deriving the async url from the sync one
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+
+class _TimedPoolMixin:
+    """Keep track of checkouts and of the time spent waiting for them"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.n_checkouts = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self._stats_lock = threading.Lock()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._stats_lock:
+                self.n_checkouts += 1
+                self.wait_time += elapsed
+                self.max_wait_time = max(self.max_wait_time, elapsed)
+
+    def stats(self) -> dict:
+        """Report the pool usage"""
+        with self._stats_lock:
+            return {
+                'size': self.size(),
+                'checked_in': self.checkedin(),
+                'checked_out': self.checkedout(),
+                'overflow': max(self.overflow(), 0),
+                'checkouts': self.n_checkouts,
+                'wait_time': self.wait_time,
+                'max_wait_time': self.max_wait_time,
+                'avg_wait_time': self.wait_time / self.n_checkouts if self.n_checkouts else 0.0,
+            }
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    """Queue pool keeping track of checkouts and of the time spent waiting for them"""
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    """Async queue pool keeping track of checkouts and of the time spent waiting for them"""
+
+
+_engine: Optional[Engine] = None
+_async_engine: Optional[AsyncEngine] = None
+_engine_lock = threading.Lock()
+
+
+def _get_db_url() -> str:
+    db_url = os.environ.get("POSTGRES_DATABASE_URL")
+    if db_url is None:
+        raise RuntimeError("POSTGRES_DATABASE_URL is not set")
+    return db_url
+
+
+def _get_connect_args(url: str) -> dict:
+    """Driver specific connection arguments"""
+    backend = make_url(url).get_backend_name()
+    if backend == 'postgresql' and DB_STATEMENT_TIMEOUT > 0:
+        return {'options': f'-c statement_timeout={DB_STATEMENT_TIMEOUT}'}
+    if backend == 'sqlite':
+        # pooled connections are shared between threads
+        return {'check_same_thread': False}
+    return {}
+
+
+def get_engine() -> Engine:
+    """Get the engine of the process, created on first use"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                db_url = _get_db_url()
+                _engine = create_engine(
+                    db_url,
+                    poolclass=TimedQueuePool,
+                    pool_size=DB_POOL_SIZE,
+                    max_overflow=DB_MAX_OVERFLOW,
+                    pool_recycle=DB_POOL_RECYCLE,
+                    pool_pre_ping=DB_POOL_PRE_PING,
+                    pool_timeout=DB_POOL_TIMEOUT,
+                    connect_args=_get_connect_args(db_url)
+                    )
+    return _engine
+
+
+def get_async_url() -> URL:
+    """
+    Get the url of the async engine, `POSTGRES_ASYNC_DATABASE_URL` if set,
+    otherwise the sync url with its async driver
+    """
+    async_url = os.environ.get("POSTGRES_ASYNC_DATABASE_URL")
+    if async_url is not None:
+        return make_url(async_url)
+    url = make_url(_get_db_url())
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()])
+
+
+def get_async_engine() -> AsyncEngine:
+    """
+    Get the async engine of the process, created on first use. Its
+    connections belong to the event loop they were opened in, so it is
+    meant to be used from a single loop, see `jumble.game.prefetch_game`
+    """
+    global _async_engine
+    if _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                async_url = get_async_url()
+                connect_args = {}
+                if async_url.get_backend_name() == 'postgresql' and DB_STATEMENT_TIMEOUT > 0:
+                    connect_args['server_settings'] = {
+                        'statement_timeout': str(DB_STATEMENT_TIMEOUT)
+                        }
+                _async_engine = create_async_engine(
+                    async_url,
+                    poolclass=TimedAsyncQueuePool,
+                    pool_size=DB_POOL_SIZE,
+                    max_overflow=DB_MAX_OVERFLOW,
+                    pool_recycle=DB_POOL_RECYCLE,
+                    pool_pre_ping=DB_POOL_PRE_PING,
+                    pool_timeout=DB_POOL_TIMEOUT,
+                    connect_args=connect_args
+                    )
+    return _async_engine
+
+
+def get_pool_stats() -> dict:
+    """Report the usage of the connection pools created so far, for monitoring"""
+    stats = {}
+    if _engine is not None:
+        stats['sync'] = _engine.pool.stats()
+    if _async_engine is not None:
+        stats['async'] = _async_engine.sync_engine.pool.stats()
+    return stats
+
+
+def log_pool_stats():
+    """Log the connection pool usage"""
+    for name, stats in get_pool_stats().items():
+        logger.info(f"{name} db pool: {stats}")
+
+
+_pool_stats_thread: Optional[threading.Thread] = None
+
+
+def start_pool_stats_logging(interval: float = DB_POOL_STATS_INTERVAL):
+    """Log the pool usage every `interval` seconds in a background thread, once per process"""
+    global _pool_stats_thread
+    if interval <= 0:
+        return
+    with _engine_lock:
+        if _pool_stats_thread is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                log_pool_stats()
+
+        _pool_stats_thread = threading.Thread(target=run, daemon=True)
+        _pool_stats_thread.start()
+
+
+class _LazySessionMaker(sessionmaker):
+    """Session factory binding sessions to an engine only when first called"""
+
+    def __init__(self, get_bind: Callable[[], Any], **kwargs):
+        super().__init__(**kwargs)
+        self.get_bind = get_bind
+
+    def __call__(self, **local_kw):
+        local_kw.setdefault('bind', self.get_bind())
+        return super().__call__(**local_kw)
+
+
+SessionLocal = _LazySessionMaker(get_engine, autocommit=False, autoflush=False)
+# attributes stay loaded after commit, as they cannot be lazy loaded in async
+AsyncSessionLocal = _LazySessionMaker(
+    get_async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+
+
+def __getattr__(name: str):
+    # `engine` used to be created at import
+    if name == 'engine':
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 if __name__ == "__main__":
 
+    engine = get_engine()
+
     # create database if not exist
     if not database_exists(engine.url):
         print(f"Creating DB: {engine.url}")
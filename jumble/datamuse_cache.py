@@ -0,0 +1,144 @@
+"""
+Persistent cache for Datamuse responses.
+
+Responses are stored in a SQLite file keyed by pattern and max words, so that
+re-runs of the generator and parallel workers reuse previous responses instead
+of hitting the network again.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+CACHE_TTL = 30 * 24 * 3600.0
+CACHE_MAX_ENTRIES = 500_000
+# how many inserts between two checks of the size cap
+EVICTION_INTERVAL = 1000
+
+
+class DatamuseCache:
+    """SQLite backed cache of Datamuse responses, safe to share across processes"""
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float = CACHE_TTL,
+        max_entries: int = CACHE_MAX_ENTRIES
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._inserts = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    hint TEXT NOT NULL,
+                    max_words INTEGER NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (hint, max_words)
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_responses_accessed_at "
+                "ON responses (accessed_at)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get the connection of the current thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            # let readers and a writer from other processes work concurrently
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, hint: str, max_words: int) -> Optional[list]:
+        """Get a cached response, None if missing or expired"""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT response FROM responses "
+                "WHERE hint = ? AND max_words = ? AND created_at >= ?",
+                (hint, max_words, now - self.ttl)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE responses SET accessed_at = ? "
+                    "WHERE hint = ? AND max_words = ?",
+                    (now, hint, max_words)
+                )
+
+        self._count(hit=row is not None)
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def set(self, hint: str, max_words: int, response: list):
+        """Store a response, evicting expired and least recently used ones"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (hint, max_words, json.dumps(response), now, now)
+            )
+
+        with self._lock:
+            self._inserts += 1
+            evict = self._inserts % EVICTION_INTERVAL == 0
+        if evict:
+            self.evict()
+
+    def evict(self):
+        """Drop expired responses and keep at most `max_entries` of them"""
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM responses WHERE created_at < ?",
+                (time.time() - self.ttl, )
+            )
+            conn.execute(
+                """
+                DELETE FROM responses WHERE rowid IN (
+                    SELECT rowid FROM responses
+                    ORDER BY accessed_at DESC
+                    LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries, )
+            )
+
+    def __len__(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    def stats(self) -> dict:
+        """Report cache usage for the current process"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+            'entries': len(self),
+        }
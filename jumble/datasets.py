@@ -0,0 +1,164 @@
+"""
+Read and write the puns and hints datasets.
+
+The format is picked from the file extension: `.parquet` and `.feather` keep
+typed columns (categorical `level`, int `score`, list of `defs`), `.csv` is
+kept as the legacy format.
+"""
+
+from pathlib import Path
+from typing import Iterator, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from jumble.schemas import DifficultyLevel
+
+LEVEL_DTYPE = pd.CategoricalDtype([t.value for t in DifficultyLevel], ordered=True)
+HINTS_DTYPES = {
+    'word': 'object',
+    'score': 'int64',
+    'defHeadword': 'object',
+    'level': LEVEL_DTYPE,
+    'placeholder': 'object',
+    'hint': 'int64',
+    'master_id': 'int64',
+}
+# columns of the hints dataset, as generated
+HINTS_COLUMNS = ['word', 'score', 'defs', 'defHeadword', 'level', 'placeholder', 'hint', 'master_id']
+PUNS_DTYPES = {
+    'id': 'int64',
+    'to_complete': 'object',
+    'solution': 'object',
+    'dialogue': 'object',
+    'image_url': 'object',
+}
+# compression of the feather files, parquet files use the pyarrow default
+FEATHER_COMPRESSION = 'zstd'
+# number of rows read at once when streaming a dataset
+CHUNK_SIZE = 50_000
+
+PathLike = Union[str, Path]
+
+
+def _get_format(path: PathLike) -> str:
+    """Get the dataset format from the file extension"""
+    suffix = Path(path).suffix.lower()
+    if suffix not in ('.parquet', '.feather', '.csv'):
+        raise ValueError(f"Unsupported dataset format: {path}")
+    return suffix[1:]
+
+
+def _read(path: PathLike) -> pd.DataFrame:
+    path = Path(path).expanduser()
+    fmt = _get_format(path)
+    if fmt == 'parquet':
+        return pd.read_parquet(path)
+    elif fmt == 'feather':
+        return pd.read_feather(path)
+    return pd.read_csv(path)
+
+
+def _iter_read(path: PathLike, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Read a dataset in chunks of at most `chunk_size` rows"""
+    path = Path(path).expanduser()
+    fmt = _get_format(path)
+    if fmt == 'parquet':
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    elif fmt == 'feather':
+        with pa.memory_map(str(path)) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                for offset in range(0, batch.num_rows, chunk_size):
+                    yield batch.slice(offset, chunk_size).to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def _write(df: pd.DataFrame, path: PathLike):
+    path = Path(path).expanduser()
+    fmt = _get_format(path)
+    if fmt == 'parquet':
+        df.to_parquet(path, index=False)
+    elif fmt == 'feather':
+        df.reset_index(drop=True).to_feather(path, compression=FEATHER_COMPRESSION)
+    else:
+        df.to_csv(path, index=0)
+
+
+def _as_dtypes(df: pd.DataFrame, dtypes: dict) -> pd.DataFrame:
+    """Cast the known columns, leaving any other one as is"""
+    return df.astype({k: v for k, v in dtypes.items() if k in df.columns})
+
+
+def split_defs(defs) -> Optional[List[str]]:
+    """Get the list of definitions, from one definition per line if a string"""
+    if isinstance(defs, str):
+        return defs.split('\n')
+    if isinstance(defs, np.ndarray):
+        return defs.tolist()
+    if isinstance(defs, (list, tuple)):
+        return list(defs)
+    # None or NaN
+    return None
+
+
+def join_defs(defs) -> Optional[str]:
+    """Get the definitions as a string, one definition per line"""
+    defs = split_defs(defs)
+    return None if defs is None else '\n'.join(defs)
+
+
+def load_puns(path: PathLike) -> pd.DataFrame:
+    """Load the puns dataset"""
+    return _as_dtypes(_read(path), PUNS_DTYPES)
+
+
+def save_puns(df_puns: pd.DataFrame, path: PathLike):
+    """Save the puns dataset"""
+    _write(_as_dtypes(df_puns, PUNS_DTYPES), path)
+
+
+def iter_puns(path: PathLike, chunk_size: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Stream the puns dataset in chunks"""
+    for df_puns in _iter_read(path, chunk_size=chunk_size):
+        yield _as_dtypes(df_puns, PUNS_DTYPES)
+
+
+def _prepare_hints(df_hints: pd.DataFrame, fmt: str) -> pd.DataFrame:
+    if fmt == 'csv':
+        # legacy files, replace all delimiter `,` by ;
+        df_hints['defs'] = df_hints['defs'].replace(',', ';', regex=True)
+    df_hints['defs'] = df_hints['defs'].map(split_defs).astype(object)
+    return _as_dtypes(df_hints, HINTS_DTYPES)
+
+
+def load_hints(path: PathLike) -> pd.DataFrame:
+    """Load the hints dataset, with `defs` as lists of definitions"""
+    return _prepare_hints(_read(path), fmt=_get_format(path))
+
+
+def iter_hints(path: PathLike, chunk_size: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Stream the hints dataset in chunks, with `defs` as lists of definitions"""
+    fmt = _get_format(path)
+    for df_hints in _iter_read(path, chunk_size=chunk_size):
+        yield _prepare_hints(df_hints, fmt=fmt)
+
+
+def save_hints(df_hints: pd.DataFrame, path: PathLike):
+    """
+    Save the hints dataset, `defs` as lists unless saved to csv. Hints are
+    sorted by master id, so that the file can be streamed by the populator
+    """
+    if len(df_hints.columns) == 0:
+        # no pun completed, the file still gets typed columns
+        df_hints = pd.DataFrame(columns=HINTS_COLUMNS)
+    df_hints = _as_dtypes(df_hints, HINTS_DTYPES)
+    df_hints = df_hints.sort_values('master_id', kind='stable')
+    defs = join_defs if _get_format(path) == 'csv' else split_defs
+    df_hints = df_hints.assign(defs=df_hints['defs'].map(defs).astype(object))
+    _write(df_hints, path)
@@ -1,59 +1,292 @@
-from typing import List
-from dataclasses import dataclass
-from jumble import schemas, crud
-from jumble.database import SessionLocal
+from typing import (Callable, Collection, Deque, Dict, Iterable, Iterator, List,
+                    NamedTuple, Optional, Sequence, Tuple, Union)
+from array import array
+from bisect import bisect_left
+from collections import defaultdict, deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from sqlalchemy.orm import Session
+from jumble import schemas, crud, crud_async
+from jumble.cache import MAX_RND_PICKS, LRUCache, catalog
+from jumble.database import AsyncSessionLocal, SessionLocal
+import asyncio
+import json
+import logging
 import random
+import struct
+import threading
+
+logger = logging.getLogger(__name__)
+
+# status of a cell of the jumbles grid
+CELL_CORRECT = 'correct'
+CELL_MISSING = 'missing'
+CELL_WRONG = 'wrong'
+
+# number of grid checkers kept, one per game being played
+GRID_CHECKERS_SIZE = 1024
+
+# number of games kept ready per difficulty level
+SNAPSHOT_POOL_SIZE = 200
+# refill the pool in the background below this number of games
+SNAPSHOT_POOL_MIN_SIZE = 50
+
+# an `ExclusionSet` chunk holds the ids sharing their high bits
+EXCLUSION_CHUNK_BITS = 16
+# ids kept as a sorted array in a chunk, it turns into a bitmap past them
+EXCLUSION_ARRAY_MAX_SIZE = 4096
+_EXCLUSION_CHUNK_MASK = (1 << EXCLUSION_CHUNK_BITS) - 1
+_EXCLUSION_BITMAP_SIZE = (1 << EXCLUSION_CHUNK_BITS) // 8
+# chunk key and number of ids in the chunk
+_EXCLUSION_CHUNK_HEADER = struct.Struct('<QI')
 
 """
 Contains class definitions to play the game
 """
 
+
+class ExclusionSet:
+    """
+    Set of master word ids, stored in fixed-size chunks keyed by the high bits
+    of the id: a sorted array of the low bits while the chunk is sparse, a
+    bitmap once it is dense, so that the size follows the number of ids played
+    """
+
+    __slots__ = ('_chunks', '_size')
+
+    def __init__(self, ids: Iterable[int] = ()):
+        self._chunks: Dict[int, Union[array, bytearray]] = {}
+        self._size = 0
+        for t in ids:
+            self.add(t)
+
+    def add(self, master_word_id: int):
+        """Add an id to the set"""
+        if master_word_id < 0:
+            raise ValueError(f"Master word ids are not negative, got {master_word_id}")
+        key, low = master_word_id >> EXCLUSION_CHUNK_BITS, master_word_id & _EXCLUSION_CHUNK_MASK
+        chunk = self._chunks.get(key)
+        if chunk is None:
+            self._chunks[key] = array('H', [low])
+        elif isinstance(chunk, bytearray):
+            byte, bit = divmod(low, 8)
+            if chunk[byte] >> bit & 1:
+                return
+            chunk[byte] |= 1 << bit
+        else:
+            i = bisect_left(chunk, low)
+            if i < len(chunk) and chunk[i] == low:
+                return
+            chunk.insert(i, low)
+            if len(chunk) > EXCLUSION_ARRAY_MAX_SIZE:
+                self._chunks[key] = self._to_bitmap(chunk)
+        self._size += 1
+
+    @staticmethod
+    def _to_bitmap(chunk: array) -> bytearray:
+        bitmap = bytearray(_EXCLUSION_BITMAP_SIZE)
+        for low in chunk:
+            bitmap[low >> 3] |= 1 << (low & 7)
+        return bitmap
+
+    def __contains__(self, master_word_id: int) -> bool:
+        if master_word_id < 0:
+            return False
+        chunk = self._chunks.get(master_word_id >> EXCLUSION_CHUNK_BITS)
+        if chunk is None:
+            return False
+        low = master_word_id & _EXCLUSION_CHUNK_MASK
+        if isinstance(chunk, bytearray):
+            return bool(chunk[low >> 3] >> (low & 7) & 1)
+        i = bisect_left(chunk, low)
+        return i < len(chunk) and chunk[i] == low
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[int]:
+        for key in sorted(self._chunks):
+            chunk = self._chunks[key]
+            high = key << EXCLUSION_CHUNK_BITS
+            if isinstance(chunk, bytearray):
+                for byte, value in enumerate(chunk):
+                    if value:
+                        for bit in range(8):
+                            if value >> bit & 1:
+                                yield high | byte * 8 + bit
+            else:
+                for low in chunk:
+                    yield high | low
+
+    def __eq__(self, other) -> bool:
+        return (
+            isinstance(other, ExclusionSet) and self._size == other._size
+            and all(a == b for a, b in zip(self, other))
+            )
+
+    def copy(self) -> 'ExclusionSet':
+        new = ExclusionSet()
+        new._chunks = {key: chunk[:] for key, chunk in self._chunks.items()}
+        new._size = self._size
+        return new
+
+    def nbytes(self) -> int:
+        """Size of the stored chunks, in bytes"""
+        return sum(
+            len(chunk) if isinstance(chunk, bytearray) else len(chunk) * chunk.itemsize
+            for chunk in self._chunks.values()
+            )
+
+    def pick_random(
+        self, master_word_ids: Sequence[int], rng: Optional[random.Random] = None
+    ) -> Optional[int]:
+        """Pick a random id of the list not in the set, None if all of them are"""
+        rng = random if rng is None else rng
+
+        # a few random draws are enough unless most ids are excluded
+        for _ in range(MAX_RND_PICKS if master_word_ids else 0):
+            master_word_id = rng.choice(master_word_ids)
+            if master_word_id not in self:
+                return master_word_id
+
+        candidates = [t for t in master_word_ids if t not in self]
+        if len(candidates) == 0:
+            return None
+        return rng.choice(candidates)
+
+    def to_bytes(self) -> bytes:
+        """Serialize the set, chunk by chunk: key, number of ids, then the ids"""
+        data = bytearray()
+        for key in sorted(self._chunks):
+            chunk = self._chunks[key]
+            if isinstance(chunk, bytearray):
+                n_ids = sum(bin(t).count('1') for t in chunk)
+                data += _EXCLUSION_CHUNK_HEADER.pack(key, n_ids) + chunk
+            else:
+                data += _EXCLUSION_CHUNK_HEADER.pack(key, len(chunk))
+                data += struct.pack(f'<{len(chunk)}H', *chunk)
+        return bytes(data)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'ExclusionSet':
+        """Deserialize a set from `ExclusionSet.to_bytes`"""
+        new = cls()
+        offset = 0
+        while offset < len(data):
+            key, n_ids = _EXCLUSION_CHUNK_HEADER.unpack_from(data, offset)
+            offset += _EXCLUSION_CHUNK_HEADER.size
+            size = _EXCLUSION_BITMAP_SIZE if n_ids > EXCLUSION_ARRAY_MAX_SIZE else n_ids * 2
+            if offset + size > len(data):
+                raise ValueError("Truncated exclusion set")
+            if n_ids > EXCLUSION_ARRAY_MAX_SIZE:
+                chunk = bytearray(data[offset:offset + size])
+            else:
+                chunk = array('H', struct.unpack_from(f'<{n_ids}H', data, offset))
+            offset += size
+            new._chunks[key] = chunk
+            new._size += n_ids
+        return new
+
+
 @dataclass
 class Game:
     """Create a game instance"""
-    to_exclude: List[int]
+    # ids of the master words already played, an `ExclusionSet` lets the
+    # random pick happen in process instead of in a NOT IN query
+    to_exclude: Union[List[int], ExclusionSet]
     difficulty_level: schemas.DifficultyLevel
+    # serve the puzzle content from the in-process catalog cache
+    use_cache: bool = True
+    # seed to reproduce the same game
+    seed: Optional[int] = None
+    # play this master word instead of a random one
+    master_word_id: Optional[int] = None
+    # serve a precomputed game from the snapshot pool when available
+    use_snapshots: bool = False
+    # game already built, in the shape of `to_dict()`
+    payload: Optional[dict] = field(default=None, repr=False)
 
     def __post_init__(self):
         """generate random master word and excecute queries"""
-        with SessionLocal() as db:
-            self.master_word = crud.read_rnd_master_word(
-                db=db,
-                exclude_ids=self.to_exclude
+        rng = random if self.seed is None else random.Random(self.seed)
+
+        if self.payload is not None:
+            self._load_snapshot(self.payload)
+            return
+
+        if self.use_snapshots and self.master_word_id is None:
+            payload = snapshot_pool.pop(
+                level=self.difficulty_level, exclude_ids=self.to_exclude
                 )
+            if payload is not None:
+                self._load_snapshot(payload)
+                return
+            # pool is empty, build the game as usual
 
-            if self.master_word is not None:
+        master_word_id = self.master_word_id
+        if master_word_id is None and isinstance(self.to_exclude, ExclusionSet):
+            master_word_id = self.to_exclude.pick_random(
+                catalog.master_word_ids(), rng=rng
+                )
 
-                # get associated jumbles and options
-                self.jumble_solution = {
-                    i.id: crud.read_single_jumble_option(
-                        jumble_id=i.id, db=db, level=self.difficulty_level,
-                        order=schemas.JumbleOptionScoreSort.rdn
+        if master_word_id is not None:
+            if self.use_cache:
+                self.master_word = catalog.read_master_word(
+                    master_word_id, level=self.difficulty_level
+                    )
+            else:
+                with SessionLocal() as db:
+                    self.master_word = crud.read_master_word_with_options(
+                        db=db,
+                        master_word_id=master_word_id,
+                        level=self.difficulty_level
                         )
-                    for i in self.master_word.jumbles
-                    }
-
-                # create jumbles
-                out = {}
-                for jumble_id, jumble_solution in self.jumble_solution.items():
-                    # shuffle jumble options
-                    shuffled = list(jumble_solution.word)
-                    while True:
-                        # keep on shuffling until we get a different word than solution
-                        random.shuffle(shuffled)
-                        if ''.join(shuffled) != jumble_solution.word:
-                            break
-                    out[jumble_id] = {
-                        'solution': jumble_solution.word,
-                        'shuffled': shuffled,
-                        'placeholder': jumble_solution.placeholder,
-                        'hint': jumble_solution.defs
-                    }
-                self.init_jumbles = out
+        elif isinstance(self.to_exclude, ExclusionSet):
+            # all master words were played
+            self.master_word = None
+        elif self.use_cache:
+            self.master_word = catalog.read_rnd_master_word(
+                exclude_ids=self.to_exclude,
+                level=self.difficulty_level,
+                rng=rng
+                )
+        else:
+            with SessionLocal() as db:
+                # master word, jumbles and options at the difficulty level
+                # are all eager loaded in a single pass
+                self.master_word = crud.read_rnd_master_word_with_options(
+                    db=db,
+                    exclude_ids=self.to_exclude,
+                    level=self.difficulty_level,
+                    rng=rng
+                    )
 
-            else:
-                self.init_jumbles = None
+        self.jumble_solution, self.init_jumbles = make_jumbles(self.master_word, rng=rng)
+
+    @classmethod
+    def from_payload(cls, payload: dict, difficulty_level: schemas.DifficultyLevel) -> 'Game':
+        """Get a game already built, from a payload of `Game.to_dict()`"""
+        return cls(to_exclude=[], difficulty_level=difficulty_level, payload=payload)
 
+    def _load_snapshot(self, payload: dict):
+        """Set the game from a payload of `Game.to_dict()`"""
+        self.jumble_solution = None
+        if payload['game_id'] is None:
+            self.master_word = None
+            self.init_jumbles = None
+            return
+
+        self.master_word = schemas.MasterWord(
+            id=payload['game_id'],
+            solution=payload['solution'],
+            image_url=payload['image_url'],
+            dialogue=payload['dialogue'],
+            to_complete=payload['to_complete']
+            )
+        # json keys are strings
+        self.init_jumbles = {
+            int(jumble_id): jumble for jumble_id, jumble in payload['jumbles'].items()
+            }
 
     @property
     def game_id(self) -> int:
@@ -100,3 +333,466 @@ class Game:
             'dialogue': self.dialogue,
             'to_complete': self.to_complete
         }
+
+    @classmethod
+    async def create_async(
+        cls,
+        to_exclude: Union[List[int], ExclusionSet],
+        difficulty_level: schemas.DifficultyLevel,
+        seed: Optional[int] = None,
+        master_word_id: Optional[int] = None,
+        use_snapshots: bool = False
+    ) -> 'Game':
+        """
+        Create a game like `Game(...)`, reading the db with the async engine
+        instead of going through the catalog cache. The puzzle is added to
+        the catalog, so that reading the game back from its `GameState`
+        doesn't hit the db either
+        """
+        rng = random if seed is None else random.Random(seed)
+        kwargs = dict(
+            to_exclude=to_exclude,
+            difficulty_level=difficulty_level,
+            use_cache=False,
+            seed=seed,
+            master_word_id=master_word_id,
+            use_snapshots=use_snapshots
+            )
+
+        payload = None
+        if use_snapshots and master_word_id is None:
+            # taken from memory, the pool is refilled in a background thread
+            payload = snapshot_pool.pop(level=difficulty_level, exclude_ids=to_exclude)
+            if payload is not None:
+                master_word_id = payload['game_id']
+
+        if master_word_id is None and isinstance(to_exclude, ExclusionSet):
+            # ids are read once per catalog ttl
+            master_word_ids = catalog.peek_master_word_ids()
+            if master_word_ids is None:
+                async with AsyncSessionLocal() as db:
+                    master_word_ids = await crud_async.read_master_word_ids(db)
+                catalog.add_master_word_ids(master_word_ids)
+            master_word_id = to_exclude.pick_random(master_word_ids, rng=rng)
+            if master_word_id is None:
+                # all master words were played
+                return cls(**kwargs, payload=dict.fromkeys(GAME_KEYS))
+
+        master_word = None
+        if master_word_id is not None:
+            master_word = catalog.peek_master_word(master_word_id, level=difficulty_level)
+
+        if master_word is None:
+            async with AsyncSessionLocal() as db:
+                if master_word_id is not None:
+                    master_word = await crud_async.read_master_word_with_options(
+                        db, master_word_id=master_word_id, level=difficulty_level
+                        )
+                else:
+                    master_word = await crud_async.read_rnd_master_word_with_options(
+                        db, exclude_ids=to_exclude, level=difficulty_level, rng=rng
+                        )
+
+                if master_word is None:
+                    return cls(**kwargs, payload=dict.fromkeys(GAME_KEYS))
+                master_word = schemas.MasterWordPuzzle.from_orm(master_word)
+            catalog.add_master_word(master_word, level=difficulty_level)
+
+        if payload is None:
+            _, jumbles = make_jumbles(master_word, rng=rng)
+            payload = {
+                'game_id': master_word.id,
+                'solution': master_word.solution,
+                'jumbles': jumbles,
+                'image_url': master_word.image_url,
+                'dialogue': master_word.dialogue,
+                'to_complete': master_word.to_complete
+                }
+        return cls(**kwargs, payload=payload)
+
+
+# keys of `Game.to_dict()`
+GAME_KEYS = ('game_id', 'solution', 'jumbles', 'image_url', 'dialogue', 'to_complete')
+
+
+def make_jumbles(
+    master_word: Optional[schemas.MasterWordPuzzle], rng: random.Random
+    ) -> Tuple[Optional[Dict[int, schemas.JumbleOption]], Optional[Dict[int, dict]]]:
+    """Pick an option per jumble of the master word and shuffle its letters"""
+    if master_word is None:
+        return None, None
+
+    # pick a random option among the ones already loaded
+    jumble_solution = {
+        i.id: rng.choice(i.jumble_options)
+        for i in master_word.jumbles
+        }
+
+    # create jumbles
+    out = {}
+    for jumble_id, option in jumble_solution.items():
+        # shuffle jumble options
+        shuffled = list(option.word)
+        while True:
+            # keep on shuffling until we get a different word than solution
+            rng.shuffle(shuffled)
+            if ''.join(shuffled) != option.word:
+                break
+        out[jumble_id] = {
+            'solution': option.word,
+            'shuffled': shuffled,
+            'placeholder': option.placeholder,
+            'hint': option.defs,
+            'option_id': option.id
+        }
+    return jumble_solution, out
+
+
+class GameState(NamedTuple):
+    """
+    Compact, immutable state of a game being played. Only ids and shuffled
+    letters are kept, the puzzle content is read from the shared catalog
+    with `load()`
+    """
+    game_id: Optional[int]
+    difficulty_level: schemas.DifficultyLevel
+    jumble_ids: Tuple[int, ...] = ()
+    option_ids: Tuple[int, ...] = ()
+    shuffled: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_game(cls, game: Game) -> 'GameState':
+        """Get the state of a game, whichever way it was created"""
+        jumble_ids = tuple(game.jumbles or ())
+        option_ids = tuple(game.jumbles[t].get('option_id') for t in jumble_ids)
+        if game.game_id is None or None in option_ids:
+            # no game, or a payload without its option ids
+            return cls(game_id=None, difficulty_level=game.difficulty_level)
+
+        return cls(
+            game_id=game.game_id,
+            difficulty_level=game.difficulty_level,
+            jumble_ids=jumble_ids,
+            option_ids=option_ids,
+            shuffled=tuple(''.join(game.jumbles[t]['shuffled']) for t in jumble_ids)
+            )
+
+    def load(self) -> Game:
+        """
+        Get the game of the state, reading its puzzle from the catalog once,
+        to be called once per rerun. The game has no id if its master word or
+        options are gone from the db, e.g. after the catalog was repopulated
+        """
+        empty = Game.from_payload(dict.fromkeys(GAME_KEYS), self.difficulty_level)
+        if self.game_id is None:
+            return empty
+
+        puzzle = catalog.read_master_word(self.game_id, level=self.difficulty_level)
+        if puzzle is None:
+            return empty
+        options = {
+            option.id: option
+            for jumble in puzzle.jumbles for option in jumble.jumble_options
+            }
+        if any(t not in options for t in self.option_ids):
+            return empty
+
+        jumbles = {}
+        for jumble_id, option_id, shuffled in zip(self.jumble_ids, self.option_ids, self.shuffled):
+            option = options[option_id]
+            jumbles[jumble_id] = {
+                'solution': option.word,
+                'shuffled': list(shuffled),
+                'placeholder': option.placeholder,
+                'hint': option.defs,
+                'option_id': option_id
+            }
+        return Game.from_payload({
+            'game_id': puzzle.id,
+            'solution': puzzle.solution,
+            'jumbles': jumbles,
+            'image_url': puzzle.image_url,
+            'dialogue': puzzle.dialogue,
+            'to_complete': puzzle.to_complete
+            }, self.difficulty_level)
+
+    def to_dict(self) -> dict:
+        """Same as `Game.to_dict()`"""
+        return self.load().to_dict()
+
+    def check_grid(
+        self, letters: Dict[int, Sequence[str]],
+        solution_parts: Optional[Sequence[str]] = None,
+        game: Optional[Game] = None
+    ) -> 'GridCheck':
+        """
+        Check the letters submitted for each jumble, and the final answer if
+        given. Passing the game of the state saves reading it again
+        """
+        return _get_grid_checker(self, game=game).check(letters, solution_parts=solution_parts)
+
+    def dumps(self) -> str:
+        """Serialize the state"""
+        return json.dumps([
+            self.game_id, self.difficulty_level.name,
+            self.jumble_ids, self.option_ids, self.shuffled
+            ], separators=(',', ':'))
+
+    @classmethod
+    def loads(cls, data: str) -> 'GameState':
+        """Deserialize a state from `GameState.dumps`"""
+        game_id, level, jumble_ids, option_ids, shuffled = json.loads(data)
+        return cls(
+            game_id=game_id,
+            difficulty_level=schemas.DifficultyLevel[level],
+            jumble_ids=tuple(jumble_ids),
+            option_ids=tuple(option_ids),
+            shuffled=tuple(shuffled)
+            )
+
+
+class GridCheck(NamedTuple):
+    """Result of the check of a submitted grid"""
+    # status of each cell, per jumble id
+    jumbles: Dict[int, Tuple[str, ...]]
+    # correct letters in the circled cells, in grid order
+    circled_letters: Tuple[str, ...]
+    # whether the final answer is right, None if not submitted
+    solution: Optional[bool]
+
+
+class GridChecker:
+    """Check submitted grids against the normalized solutions of a game"""
+
+    __slots__ = ('_solutions', '_circled', '_solution')
+
+    def __init__(self, jumbles: Dict[int, dict], solution: str):
+        # one cell per placeholder letter
+        self._solutions = {
+            jumble_id: tuple(data['solution'].lower()[:len(data['placeholder'])])
+            for jumble_id, data in jumbles.items()
+            }
+        # positions of the cells whose letters make up the final answer
+        self._circled = {
+            jumble_id: tuple(i for i, t in enumerate(data['placeholder']) if t != '?')
+            for jumble_id, data in jumbles.items()
+            }
+        self._solution = solution.lower()
+
+    @classmethod
+    def from_game(cls, game: Game) -> 'GridChecker':
+        return cls(game.jumbles, solution=game.solution)
+
+    def check(
+        self, letters: Dict[int, Sequence[str]],
+        solution_parts: Optional[Sequence[str]] = None
+    ) -> GridCheck:
+        """
+        Check the letters submitted for each jumble, missing cells being empty
+        strings, and the parts of the final answer if given
+        """
+        statuses = {}
+        circled_letters = []
+        for jumble_id, solution in self._solutions.items():
+            submitted = [t.lower() for t in letters.get(jumble_id, ())]
+            status = [
+                CELL_MISSING if t == '' else CELL_CORRECT if t == u else CELL_WRONG
+                for t, u in zip(submitted, solution)
+                ]
+            # cells not submitted at all are missing
+            status += [CELL_MISSING] * (len(solution) - len(status))
+            statuses[jumble_id] = tuple(status)
+            circled_letters += [
+                submitted[i] for i in self._circled[jumble_id] if status[i] == CELL_CORRECT
+                ]
+
+        solution = None
+        if solution_parts is not None:
+            solution = ' '.join(t.strip().lower() for t in solution_parts) == self._solution
+
+        return GridCheck(
+            jumbles=statuses,
+            circled_letters=tuple(circled_letters),
+            solution=solution
+            )
+
+
+# checkers of the games being played, shared by the reruns of a game
+_grid_checkers = LRUCache(max_size=GRID_CHECKERS_SIZE)
+
+
+def _get_grid_checker(state: GameState, game: Optional[Game] = None) -> GridChecker:
+    checker = _grid_checkers.get(state)
+    if checker is None:
+        checker = GridChecker.from_game(state.load() if game is None else game)
+        _grid_checkers.set(state, checker)
+    return checker
+
+
+_prefetch_loop: Optional[asyncio.AbstractEventLoop] = None
+_prefetch_lock = threading.Lock()
+
+
+def _get_prefetch_loop() -> asyncio.AbstractEventLoop:
+    """Event loop running in a background thread, shared by all prefetched games"""
+    global _prefetch_loop
+    with _prefetch_lock:
+        if _prefetch_loop is None:
+            _prefetch_loop = asyncio.new_event_loop()
+            threading.Thread(target=_prefetch_loop.run_forever, daemon=True).start()
+    return _prefetch_loop
+
+
+def prefetch_game(**kwargs) -> Future:
+    """
+    Start creating a game in the background with `Game.create_async` and
+    its arguments, the game is the result of the returned future
+    """
+    return asyncio.run_coroutine_threadsafe(
+        Game.create_async(**kwargs), _get_prefetch_loop()
+        )
+
+
+def release_prefetched_game(future: Future):
+    """
+    Give a prefetched game that won't be played to the snapshot pool, once
+    it is created, so that another player gets it
+    """
+    def release(future: Future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        game = future.result()
+        if game.game_id is not None:
+            snapshot_pool.put(game.difficulty_level, game.to_dict())
+
+    future.add_done_callback(release)
+
+
+def make_snapshots(
+    level: schemas.DifficultyLevel, n_snapshots: int,
+    rng: Optional[random.Random] = None
+    ) -> List[dict]:
+    """Precompute games at the difficulty level, as rows of the snapshots table"""
+    rng = random if rng is None else rng
+
+    master_word_ids = catalog.master_word_ids()
+    if len(master_word_ids) == 0:
+        return []
+
+    snapshots = []
+    for _ in range(n_snapshots):
+        game = Game(
+            to_exclude=[],
+            difficulty_level=level,
+            master_word_id=rng.choice(master_word_ids),
+            seed=rng.getrandbits(32)
+            )
+        if game.game_id is None:
+            continue
+        snapshots.append({
+            'master_word_id': game.game_id,
+            'level': level.value,
+            'payload': game.to_dict()
+            })
+    return snapshots
+
+
+def materialize_snapshots(
+    db: Session, level: schemas.DifficultyLevel, n_snapshots: int,
+    rng: Optional[random.Random] = None
+    ) -> int:
+    """Precompute games at the difficulty level and add them to the snapshots table"""
+    snapshots = make_snapshots(level, n_snapshots=n_snapshots, rng=rng)
+    return crud.create_game_snapshots(db, snapshots=snapshots)
+
+
+class SnapshotPool:
+    """
+    In-process pool of precomputed games per difficulty level, so that taking
+    one needs no db access. It is refilled in the background when it runs
+    low, with the snapshots materialized in the `game_snapshots` table first,
+    then with games built in process
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        size: int = SNAPSHOT_POOL_SIZE,
+        min_size: int = SNAPSHOT_POOL_MIN_SIZE
+    ):
+        self.session_factory = session_factory
+        self.size = size
+        self.min_size = min_size
+        self._games: Dict[schemas.DifficultyLevel, Deque[dict]] = defaultdict(deque)
+        self._refilling = set()
+        self._lock = threading.Lock()
+
+    def pop(
+        self, level: schemas.DifficultyLevel, exclude_ids: Collection[int]
+    ) -> Optional[dict]:
+        """Take a game at the difficulty level out of the pool, None if none playable"""
+        with self._lock:
+            games = self._games[level]
+            payload = None
+            for i, game in enumerate(games):
+                if game['game_id'] not in exclude_ids:
+                    payload = game
+                    del games[i]
+                    break
+            n_left = len(games)
+
+        if n_left < self.min_size:
+            self.refill_async(level)
+        return payload
+
+    def put(self, level: schemas.DifficultyLevel, payload: dict):
+        """Add a game not played after all to the pool, unless it is full"""
+        with self._lock:
+            games = self._games[level]
+            if len(games) < self.size:
+                games.append(payload)
+
+    def count(self, level: schemas.DifficultyLevel) -> int:
+        """Number of games left in the pool at the difficulty level"""
+        with self._lock:
+            return len(self._games[level])
+
+    def refill(self, level: schemas.DifficultyLevel) -> int:
+        """Top the pool up to its size at the difficulty level"""
+        n_missing = self.size - self.count(level)
+        if n_missing <= 0:
+            return 0
+
+        with self.session_factory() as db:
+            payloads = crud.take_game_snapshots(db, level=level, n_snapshots=n_missing)
+        # build the games missing from the table
+        payloads += [
+            t['payload'] for t in make_snapshots(level, n_snapshots=n_missing - len(payloads))
+            ]
+
+        with self._lock:
+            self._games[level].extend(payloads)
+        return len(payloads)
+
+    def refill_async(self, level: schemas.DifficultyLevel):
+        """Refill the pool in a background thread, unless already refilling"""
+        with self._lock:
+            if level in self._refilling:
+                return
+            self._refilling.add(level)
+        threading.Thread(
+            target=self._refill_in_background, args=(level, ), daemon=True
+            ).start()
+
+    def _refill_in_background(self, level: schemas.DifficultyLevel):
+        try:
+            self.refill(level)
+        except Exception:
+            logger.exception(f"Failed to refill the snapshot pool at level {level.value}")
+        finally:
+            with self._lock:
+                self._refilling.discard(level)
+
+
+# shared snapshot pool for the running process
+snapshot_pool = SnapshotPool()
@@ -4,20 +4,35 @@ Starting from a list of pun ideas:
 - find the 4 hint words associated to a master word to guess
 """
 
+import glob
+import json
 import logging
+import os
 import random
 import re
-from functools import lru_cache
-from typing import List, Optional
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import (FIRST_COMPLETED, Executor, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
+from functools import lru_cache, partial
+from itertools import combinations, islice, permutations
+from math import comb
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
 
 import pandas as pd
 import requests
 from fuzzywuzzy import fuzz
+from fuzzywuzzy import utils as fuzz_utils
 from requests.exceptions import HTTPError
 from tenacity import (RetryError, retry, retry_if_exception_type,
                       stop_after_attempt, wait_random)
 from tqdm import tqdm
 
+from jumble.datamuse_cache import DatamuseCache
+from jumble.datasets import load_puns, save_hints
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
@@ -29,52 +44,251 @@ EXCLUDE_WORDS = [
     'surname', 'given name', 'acronym', 'initial', 'obsolete spelling',
     'abbreviation', 'archaic'
 ]
+# single alternation matching any of the excluded words
+EXCLUDE_PATTERN = re.compile('|'.join(re.escape(t) for t in EXCLUDE_WORDS))
+DATAMUSE_URL = 'https://api.datamuse.com/words'
+MAX_REQUESTS_PER_SECOND = 10
+# seconds to wait for Datamuse, so that a hung connection gets retried
+DATAMUSE_TIMEOUT = 10
+MAX_WORKERS = 8
+# puns submitted ahead of the one being consumed, per worker
+MAX_PENDING_PER_WORKER = 2
+# puns whose hints are concatenated together while generating all hints
+HINTS_BATCH_SIZE = 64
+N_SHARDS = os.cpu_count() or 1
+CHECKPOINT_PATTERN = 'hints-shard-*.jsonl'
+
+
+class HostRateLimiter:
+    """Space out requests made to a same host, across threads"""
+
+    def __init__(self, max_requests_per_second: float = MAX_REQUESTS_PER_SECOND):
+        self.max_requests_per_second = max_requests_per_second
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str):
+        """Block until a request to the url's host is allowed"""
+        if not self.max_requests_per_second:
+            return
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + 1 / self.max_requests_per_second
+        time.sleep(slot - now)
+
+
+rate_limiter = HostRateLimiter()
+# persist Datamuse responses across runs when a cache file is configured
+response_cache = DatamuseCache(os.environ['DATAMUSE_CACHE_PATH']) \
+    if os.environ.get('DATAMUSE_CACHE_PATH') else None
+_thread_local = threading.local()
+
+
+def _get_http_session() -> requests.Session:
+    """Get a http session for the current thread, reusing its connections"""
+    if not hasattr(_thread_local, 'session'):
+        _thread_local.session = requests.Session()
+    return _thread_local.session
+
+
+def make_datamuse_request(hint: str, max_words: int =MAX_WORDS) -> dict:
+    """Query condidate words given a hint, from the response cache or Datamuse"""
+
+    if response_cache is not None:
+        response = response_cache.get(hint, max_words)
+        if response is not None:
+            return response
+
+    response = fetch_datamuse(hint, max_words=max_words)
+
+    if response_cache is not None:
+        response_cache.set(hint, max_words, response)
+
+    return response
+
 
 @retry(
-    retry=retry_if_exception_type(HTTPError),
+    retry=retry_if_exception_type((HTTPError, requests.Timeout, requests.ConnectionError)),
     stop=stop_after_attempt(5),
     wait=wait_random(0, 2)
 )
 @lru_cache()
-def make_datamuse_request(hint: str, max_words: int =MAX_WORDS) -> dict:
+def fetch_datamuse(hint: str, max_words: int =MAX_WORDS) -> dict:
     """Make request to Datamuse to query condidate words given a hint"""
 
-    base_url = 'https://api.datamuse.com/words'
+    base_url = DATAMUSE_URL
     code = '?sp='
     add_definition = 'md=d'
     max_words = f'max={max_words}'
 
     url = f"{base_url}{code}{hint}&{add_definition}&{max_words}"
 
-    response = requests.get(url)
+    rate_limiter.wait(url)
+    response = _get_http_session().get(url, timeout=DATAMUSE_TIMEOUT)
 
     response.raise_for_status()
 
     return response.json()
 
 
-def get_hint_placeholder(hint_letters: str) -> str:
-    """Returns the hint placeholder with disjoined letters to be sent to datamuse request"""
-
-    hint = None
-    while True:
-        # get desired hint world lenght
-        # if we pick 2 letters, return a 4 letter word, if we pick 3 letters, return a 5/6 letters words
-        len_hint = random.randint(4, 5) \
-            if len(hint_letters)==2 else random.randint(5, 7)
-
-        # form placeholder word hint with provided letters and given length
-        hint = ''.join(hint_letters)
-        hint = list(hint.zfill(len_hint).replace('0', '?'))
-        # reshuffle word hint
-        random.shuffle(hint)
-        # cast as string
-        hint = ''.join(hint)
-        # make sure all letters are disjoint
-        cond = max([len(t) for t in hint.split('?')])
-        if cond == 1:
-            break
-    return hint
+class WordIndex:
+    """
+    Offline index of words answering the Datamuse `sp=` wildcard patterns.
+
+    Words are bucketed by length and, for each (position, letter) pair, a
+    python int is used as a bitmap of the words having that letter there.
+    A pattern like `?r?f?i?` is answered by AND-ing the bitmaps of its
+    fixed letters. Words are sorted by decreasing score, so the lowest set
+    bits are the best candidates, as in a Datamuse response.
+    """
+
+    def __init__(self, df_words: pd.DataFrame):
+        # expects `word`, `score` and `defs` (list of definitions or None)
+        df_words = df_words.sort_values('score', ascending=False, kind='stable')
+
+        self._words: Dict[int, List[dict]] = {}
+        self._bitmaps: Dict[tuple, int] = {}
+        seen = set()
+        for record in df_words[['word', 'score', 'defs']].to_dict('records'):
+            word = record['word'].lower()
+            if word in seen:
+                # case variants of a word, only the best scored one is kept
+                continue
+            seen.add(word)
+            bucket = self._words.setdefault(len(word), [])
+            bit = 1 << len(bucket)
+            for position, letter in enumerate(word):
+                key = (len(word), position, letter)
+                self._bitmaps[key] = self._bitmaps.get(key, 0) | bit
+            entry = {'word': word, 'score': int(record['score'])}
+            if record['defs'] is not None:
+                entry['defs'] = list(record['defs'])
+            bucket.append(entry)
+
+    @classmethod
+    def from_csv(cls, path: str) -> 'WordIndex':
+        """Build the index from a csv of `word`, `score` and `defs`, one definition per line"""
+        df_words = pd.read_csv(path, usecols=['word', 'score', 'defs'])
+        df_words['defs'] = df_words['defs'].apply(
+            lambda x: x.split('\n') if isinstance(x, str) else None
+            )
+        return cls(df_words)
+
+    def _match(self, pattern: str) -> int:
+        """Get the bitmap of the words matching a pattern"""
+        pattern = pattern.lower()
+        n_words = len(self._words.get(len(pattern), []))
+        matches = (1 << n_words) - 1
+        for position, letter in enumerate(pattern):
+            if letter == '?':
+                continue
+            matches &= self._bitmaps.get((len(pattern), position, letter), 0)
+            if matches == 0:
+                break
+        return matches
+
+    def count(self, pattern: str) -> int:
+        """Count the words matching a pattern"""
+        return bin(self._match(pattern)).count('1')
+
+    def query(self, pattern: str, max_words: int = MAX_WORDS) -> List[dict]:
+        """Get the words matching a pattern, in the shape of a Datamuse response"""
+        words = self._words.get(len(pattern), [])
+        matches = self._match(pattern)
+        out = []
+        while matches and len(out) < max_words:
+            # pop the lowest set bit, i.e. the best scored remaining word
+            lowest = matches & -matches
+            out.append(words[lowest.bit_length() - 1])
+            matches ^= lowest
+        return out
+
+
+def get_defs_to_drop(defs: pd.Series, pattern: re.Pattern = EXCLUDE_PATTERN) -> pd.Series:
+    """
+    Flag the candidates to drop given their definitions: the ones without
+    definition and the ones with any definition mentioning an excluded word
+    """
+    # all definitions of a candidate in a single lowercase string, the
+    # excluded words have no newline so a match can't span two definitions
+    all_defs = defs.map(lambda x: None if x is None else '\n'.join(x).lower())
+    return all_defs.map(lambda x: x is None or pattern.search(x) is not None)
+
+
+def get_hint_lengths(n_letters: int) -> range:
+    """Get the possible hint word lengths given the number of hint letters"""
+    # if we pick 2 letters, return a 4/5 letter word, if we pick 3 letters, return a 5/6/7 letters words
+    return range(4, 6) if n_letters == 2 else range(5, 8)
+
+
+@lru_cache()
+def get_placeholder_layouts(n_letters: int, length: int) -> Tuple[Tuple[int, ...], ...]:
+    """Get all the positions of n letters in a word of given length with no two letters adjacent"""
+    return tuple(
+        positions for positions in combinations(range(length), n_letters)
+        if all(b - a > 1 for a, b in zip(positions, positions[1:]))
+        )
+
+
+def _fill_placeholder(hint_letters: List[str], length: int, positions: Tuple[int, ...]) -> str:
+    """Form a placeholder with the hint letters at the given positions"""
+    hint = ['?']*length
+    for position, letter in zip(positions, hint_letters):
+        hint[position] = letter
+    return ''.join(hint)
+
+
+def get_all_hint_placeholders(hint_letters: str) -> List[str]:
+    """Get all the distinct placeholders with disjoined letters for the hint letters"""
+    placeholders = {
+        _fill_placeholder(letters, length, positions)
+        for length in get_hint_lengths(len(hint_letters))
+        for positions in get_placeholder_layouts(len(hint_letters), length)
+        for letters in permutations(hint_letters)
+        }
+    return sorted(placeholders)
+
+
+def get_hint_placeholder(
+    hint_letters: str, rng: Optional[random.Random] = None,
+    rank_index: Optional[WordIndex] = None,
+    min_candidates: int = MIN_CANDIDATES
+    ) -> str:
+    """
+    Returns the hint placeholder with disjoined letters to be sent to datamuse request.
+
+    A length is drawn, weighted by the share of its layouts having no two
+    hint letters adjacent, then a valid layout is picked and filled with the
+    shuffled hint letters. This gives the same distribution as drawing
+    shuffled placeholders until one has disjoined letters.
+    When a `rank_index` is provided, the pick is restricted to placeholders
+    matching at least `min_candidates` words of the index, if any.
+    """
+    rng = random if rng is None else rng
+
+    if rank_index is not None:
+        counts = {
+            hint: rank_index.count(hint)
+            for hint in get_all_hint_placeholders(hint_letters)
+            }
+        likely = [hint for hint, count in counts.items() if count >= min_candidates]
+        if len(likely) > 0:
+            return rng.choice(likely)
+        # no placeholder is likely to succeed, go for the best one
+        return max(counts, key=counts.get)
+
+    lengths = get_hint_lengths(len(hint_letters))
+    weights = [
+        len(get_placeholder_layouts(len(hint_letters), length)) / comb(length, len(hint_letters))
+        for length in lengths
+        ]
+    len_hint = rng.choices(lengths, weights=weights)[0]
+    positions = rng.choice(get_placeholder_layouts(len(hint_letters), len_hint))
+    letters = list(hint_letters)
+    rng.shuffle(letters)
+    return _fill_placeholder(letters, len_hint, positions)
 
 @retry(
     retry=retry_if_exception_type(ValueError),
@@ -83,19 +297,32 @@ def get_hint_placeholder(hint_letters: str) -> str:
 def get_hint_word_candidates(
     hint_letters: str,
     min_candidates: int = MIN_CANDIDATES,
-    verbose: bool = False
+    verbose: bool = False,
+    word_index: Optional[WordIndex] = None,
+    rng: Optional[random.Random] = None,
+    rank_index: Optional[WordIndex] = None
 )-> pd.DataFrame:
-    """Get hint words using the provided hint letters"""
+    """
+    Get hint words using the provided hint letters, from the local word index
+    if provided, from Datamuse otherwise. A `rank_index` steers the
+    placeholder towards ones with enough candidates, saving retries.
+    """
 
-    hint = get_hint_placeholder(hint_letters)
+    hint = get_hint_placeholder(
+        hint_letters, rng=rng, rank_index=rank_index,
+        min_candidates=min_candidates
+        )
 
     if verbose:
         logger.info(f"""
         Looking for candidates with letters={hint}
         """)
 
-    # get word candidates from data muse
-    candidates = make_datamuse_request(hint)
+    # get word candidates from local index or data muse
+    if word_index is not None:
+        candidates = word_index.query(hint)
+    else:
+        candidates = make_datamuse_request(hint)
 
     # process to apply diffuiculty level and find good candidate
     df = pd.DataFrame(candidates)
@@ -106,17 +333,7 @@ def get_hint_word_candidates(
     if 'defs' not in df.columns:
         df['defs'] = None
 
-    def _to_drop(x: Optional[list], exclude_words: List[str] = EXCLUDE_WORDS):
-        """Decide to drop a given row given conditions"""
-        # drop words without description
-        if x is None:
-            return True
-        # exlude some specific cases out of scope
-        cond = [any([i in t.lower() for t in x]) for i in exclude_words]
-        return any(cond)
-
-
-    df = df[~df['defs'].apply(lambda x: _to_drop(x))].copy()
+    df = df[~get_defs_to_drop(df['defs'])].copy()
 
     if len(df) < min_candidates:
         # retry another combination recursively
@@ -138,43 +355,54 @@ def get_hint_word_candidates(
     retry=retry_if_exception_type(RetryError),
     stop=stop_after_attempt(MAX_RETRY)
 )
-def get_all_hints(master_word: str, master_id: int, n_hints:List[int]) ->pd.DataFrame:
+def get_all_hints(
+    master_word: str, master_id: int, n_hints:List[int],
+    word_index: Optional[WordIndex] = None,
+    rng: Optional[random.Random] = None,
+    rank_index: Optional[WordIndex] = None
+    ) ->pd.DataFrame:
     """Get all possible hints for a given word"""
+    rng = random if rng is None else rng
     try:
         # form 4 hint words
         shuffled_master = list(master_word)
         # shuffle letters
-        random.shuffle(shuffled_master)
+        rng.shuffle(shuffled_master)
 
 
-        df_all_hint_candidates = pd.DataFrame()
+        hint_candidates = []
         for i, n in enumerate(n_hints):
 
             # pick n letters from the master word
             hint_letters = shuffled_master[:n]
 
             # get possible hint candidates
-            df_candidates = get_hint_word_candidates(hint_letters)
+            df_candidates = get_hint_word_candidates(
+                hint_letters, word_index=word_index, rng=rng,
+                rank_index=rank_index
+                )
 
             # assign hint number
             df_candidates['hint'] = i+1
 
-            # store in df
-            df_all_hint_candidates = pd.concat(
-                [df_all_hint_candidates, df_candidates], axis=0
-                )
-
+            # store candidates, concatenated once all hints are found
+            hint_candidates.append(df_candidates)
 
             # drop letters from master
             shuffled_master = shuffled_master[len(hint_letters):]
 
+        df_all_hint_candidates = pd.concat(hint_candidates, axis=0)
+
     except RetryError:
         # bad luck with the shuffling, try another one
         logger.warning(f"Retry for {master_word}, {master_id}, {n_hints}")
         df_all_hint_candidates = get_all_hints(
             master_word=master_word,
             master_id=master_id,
-            n_hints=n_hints
+            n_hints=n_hints,
+            word_index=word_index,
+            rng=rng,
+            rank_index=rank_index
             )
 
     # assign master id
@@ -186,65 +414,363 @@ def get_all_hints(master_word: str, master_id: int, n_hints:List[int]) ->pd.Data
 def sanitize_hints(row) -> str:
     """Remove any mention of the hint word in defs"""
     hint_word = row['word']
+    return _sanitize_defs(
+        hint_word, row['defs'],
+        is_match=lambda u: fuzz.token_sort_ratio(hint_word, u) > 70
+        )
+
+
+def _sanitize_defs(
+    hint_word: str, defs: List[str], is_match: Callable[[str], bool]
+    ) -> str:
+    """Remove mentions of the hint word in defs, given a token matcher"""
     # convert definitions to string
-    defs = '\n'.join([t.strip() for t in row['defs']])
+    defs = '\n'.join([t.strip() for t in defs])
     # remove mentions of hint word
     fuzz_match = set([
         re.sub("[^a-zA-Z]", ' ', u).strip()
-        for u in defs.split(' ') if fuzz.token_sort_ratio(hint_word, u) > 70
+        for u in defs.split(' ') if is_match(u)
     ])
     for m in fuzz_match:
         defs = defs.replace(m, '?'.ljust(len(hint_word), '?'))
 
     return defs
 
-def generate_all_hints(df_puns: pd.DataFrame) ->pd.DataFrame:
-    """get all hints for all master words"""
-
-    df_all_hints = pd.DataFrame()
 
-    for _, row in tqdm(df_puns.iterrows(), total=len(df_puns)):
+def _sort_tokens(s: str) -> str:
+    """Process a string the same way as fuzz.token_sort_ratio"""
+    return ' '.join(sorted(fuzz_utils.full_process(s, force_ascii=True).split())).strip()
+
+
+def _get_hint_matcher(
+    hint_word: str, sorted_tokens: Dict[str, str]
+    ) -> Callable[[str], bool]:
+    """
+    Get a memoized equivalent of `fuzz.token_sort_ratio(hint_word, u) > 70`.
+
+    The ratio of two strings is at most 2*min(len)/sum(len), so tokens whose
+    processed length is too far from the hint word's are rejected without
+    being scored. `sorted_tokens` caches processed tokens across hint words.
+    """
+    sorted_hint = _sort_tokens(hint_word)
+    matches: Dict[str, bool] = {}
+
+    def is_match(token: str) -> bool:
+        match = matches.get(token)
+        if match is not None:
+            return match
+
+        sorted_token = sorted_tokens.get(token)
+        if sorted_token is None:
+            sorted_token = sorted_tokens[token] = _sort_tokens(token)
+
+        len_hint, len_token = len(sorted_hint), len(sorted_token)
+        if len_hint and len_token and fuzz_utils.intr(
+            200 * min(len_hint, len_token) / (len_hint + len_token)
+            ) <= 70:
+            match = False
+        else:
+            match = fuzz.ratio(sorted_hint, sorted_token) > 70
+        matches[token] = match
+        return match
+
+    return is_match
+
+
+def sanitize_all_hints(
+    df_hints: pd.DataFrame, sorted_tokens: Optional[Dict[str, str]] = None
+    ) -> pd.Series:
+    """
+    Batched `sanitize_hints` over all rows, scoring each distinct token once
+    per hint word
+    """
+    sorted_tokens = {} if sorted_tokens is None else sorted_tokens
+    words = df_hints['word'].tolist()
+    all_defs = df_hints['defs'].tolist()
+
+    # group rows by hint word
+    positions = defaultdict(list)
+    for i, word in enumerate(words):
+        positions[word].append(i)
+
+    out = [None]*len(words)
+    for word, word_positions in positions.items():
+        is_match = _get_hint_matcher(word, sorted_tokens)
+        for i in word_positions:
+            out[i] = _sanitize_defs(word, all_defs[i], is_match=is_match)
+
+    return pd.Series(out, index=df_hints.index, dtype=object)
+
+
+def get_n_hints(master_word: str) -> List[int]:
+    """Get the number of letters of each hint word needed for a master word"""
+    # get world count
+    words_count = len(master_word)
+    # get how many 2 letter hint words are needed
+    n_hints = [2]*(words_count//2)
+    if words_count%2 != 0:
+        # last word need to be a 3 letter one to match all master letters
+        n_hints[0] = 3
+    return n_hints
+
+
+def get_pun_rng(seed: Optional[int], master_id: int) -> Optional[random.Random]:
+    """
+    Get the random generator of a pun, derived from the run seed and the pun
+    id so that results don't depend on which thread or process handles it
+    """
+    if seed is None:
+        return None
+    return random.Random(f'{seed}-{master_id}')
+
+
+def get_pun_hints(
+    pun: pd.Series, word_index: Optional[WordIndex] = None,
+    seed: Optional[int] = None,
+    rank_index: Optional[WordIndex] = None
+    ) -> Optional[pd.DataFrame]:
+    """get all hints for a single pun, None if generation failed"""
+
+    # get a given master word
+    master_word = pun['solution'].replace(' ', '')
+    master_id = pun['id']
 
-        # get a given master word
-        master_word = row['solution'].replace(' ', '')
-        master_id = row['id']
-
-        # get world count
-        words_count = len(master_word)
-        # get how many 2 letter hint words are needed
-        n_hints = [2]*(words_count//2)
-        if words_count%2 != 0:
-            # last word need to be a 3 letter one to match all master letters
-            n_hints[0] = 3
+    try:
+        # get associated hints
+        return get_all_hints(
+            master_word=master_word,
+            master_id=master_id,
+            n_hints=get_n_hints(master_word),
+            word_index=word_index,
+            rng=get_pun_rng(seed, master_id),
+            rank_index=rank_index
+            )
+    except Exception as e:
+        logger.error(f'Failed getting hints for {master_word} with error {e}')
+        return None
+
+
+def _map_bounded(
+    executor: Executor, fn: Callable, items: Iterable, max_pending: int,
+    ordered: bool = True
+    ) -> Iterator:
+    """
+    Same as `executor.map`, with at most `max_pending` items submitted and
+    not consumed yet, so that neither the items nor the results pile up in
+    memory. Results come in the items order, or as soon as each one completes
+    if not `ordered`
+    """
+    items = iter(items)
+    pending = deque(executor.submit(fn, t) for t in islice(items, max_pending))
+    while pending:
+        if ordered:
+            future = pending.popleft()
+        else:
+            # a slow item doesn't hold back the ones after it
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            future = next(t for t in pending if t in done)
+            pending.remove(future)
+        # keep the workers busy while the result is consumed
+        pending.extend(executor.submit(fn, t) for t in islice(items, 1))
+        yield future.result()
+
+
+def iter_all_hints(
+    df_puns: pd.DataFrame, max_workers: int = MAX_WORKERS,
+    word_index: Optional[WordIndex] = None,
+    seed: Optional[int] = None,
+    rank_index: Optional[WordIndex] = None,
+    ordered: bool = True
+    ) -> Iterator[pd.DataFrame]:
+    """
+    yield the formatted hints of each master word, with up to `max_workers`
+    puns processed concurrently while waiting on Datamuse, or fully offline
+    when a local word index is provided. A `seed` makes the output
+    reproducible. Hints come in the puns order, or as soon as each pun
+    completes if not `ordered`. Only `MAX_PENDING_PER_WORKER` puns per
+    worker are submitted ahead, so memory doesn't grow with the puns.
+    """
+
+    # processed definition tokens, shared by all puns
+    sorted_tokens = {}
+
+    get_hints = partial(
+        get_pun_hints, word_index=word_index, seed=seed, rank_index=rank_index
+        )
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = _map_bounded(
+            executor, get_hints, (row for _, row in df_puns.iterrows()),
+            max_pending=max_workers * MAX_PENDING_PER_WORKER, ordered=ordered
+            )
+        for df_hints in tqdm(results, total=len(df_puns)):
+            if df_hints is None:
+                continue
+            # format hints
+            df_hints['defs'] = sanitize_all_hints(df_hints, sorted_tokens=sorted_tokens)
+            yield df_hints
+
+
+def generate_all_hints(
+    df_puns: pd.DataFrame, max_workers: int = MAX_WORKERS,
+    word_index: Optional[WordIndex] = None,
+    seed: Optional[int] = None,
+    rank_index: Optional[WordIndex] = None
+    ) ->pd.DataFrame:
+    """get all hints for all master words"""
 
-        try:
-            # get associated hints
-            df_hints = get_all_hints(
-                master_word=master_word, master_id=master_id, n_hints=n_hints
-                )
-            # store in all df
-            df_all_hints = pd.concat([df_all_hints, df_hints], axis=0)
-        except Exception as e:
-            logger.error(f'Failed getting hints for {master_word} with error {e}')
+    # hints of a batch of puns are concatenated together, so that many small
+    # frames are not kept alive until the end
+    batches = []
+    batch = []
+    for df_hints in iter_all_hints(
+        df_puns, max_workers=max_workers, word_index=word_index, seed=seed,
+        rank_index=rank_index
+        ):
+        batch.append(df_hints)
+        if len(batch) == HINTS_BATCH_SIZE:
+            batches.append(pd.concat(batch, axis=0))
+            batch = []
+    if len(batch) > 0:
+        batches.append(pd.concat(batch, axis=0))
+    if len(batches) == 0:
+        return pd.DataFrame()
+
+    # materialize all hints at once
+    return pd.concat(batches, axis=0)
+
+
+def read_checkpoints(checkpoint_dir: str) -> Dict[int, List[dict]]:
+    """
+    Read the hints of all completed puns from the shard checkpoints, dropping
+    a last line left incomplete by an interrupted run
+    """
+    completed = {}
+    for path in sorted(glob.glob(os.path.join(checkpoint_dir, CHECKPOINT_PATTERN))):
+        with open(path, encoding='utf-8') as f:
+            lines = f.readlines()
+
+        valid_lines = []
+        for line in lines:
+            try:
+                checkpoint = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Dropping incomplete checkpoint line in {path}")
+                continue
+            valid_lines.append(line)
+            completed.setdefault(checkpoint['master_id'], checkpoint['hints'])
+
+        if len(valid_lines) < len(lines):
+            # rewrite the checkpoint so that new lines are appended cleanly
+            with open(path, 'w', encoding='utf-8') as f:
+                f.writelines(valid_lines)
+
+    return completed
+
+
+def generate_hints_shard(
+    df_puns: pd.DataFrame, checkpoint_path: str,
+    max_workers: int = MAX_WORKERS,
+    word_index: Optional[WordIndex] = None,
+    max_requests_per_second: float = MAX_REQUESTS_PER_SECOND,
+    seed: Optional[int] = None,
+    rank_index: Optional[WordIndex] = None
+    ) -> int:
+    """
+    get all hints for a shard of puns, appending each pun's hints to the
+    shard checkpoint as soon as it completes. Returns the number of puns done
+    """
+    # each process has its own rate limiter
+    rate_limiter.max_requests_per_second = max_requests_per_second
+
+    n_done = 0
+    for df_hints in iter_all_hints(
+        df_puns, max_workers=max_workers, word_index=word_index, seed=seed,
+        rank_index=rank_index, ordered=False
+        ):
+        checkpoint = {
+            'master_id': int(df_hints['master_id'].iloc[0]),
+            'hints': json.loads(df_hints.to_json(orient='records'))
+        }
+        # one line per pun, flushed right away
+        with open(checkpoint_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(checkpoint) + '\n')
+        n_done += 1
+
+    return n_done
+
+
+def generate_all_hints_sharded(
+    df_puns: pd.DataFrame, checkpoint_dir: str,
+    n_shards: int = N_SHARDS,
+    max_workers: int = MAX_WORKERS,
+    word_index: Optional[WordIndex] = None,
+    seed: Optional[int] = None,
+    rank_index: Optional[WordIndex] = None
+    ) ->pd.DataFrame:
+    """
+    get all hints for all master words, split in shards processed by a pool
+    of processes. Puns already in the checkpoints of `checkpoint_dir` are
+    skipped, so an interrupted run can be resumed by calling it again.
+    Each pun derives its own generator from `seed`, so a seeded run gives the
+    same hints whatever the number of shards.
+    """
+    os.makedirs(checkpoint_dir, exist_ok=True)
+
+    # resume from previous runs
+    completed = read_checkpoints(checkpoint_dir)
+    df_todo = df_puns[~df_puns['id'].isin(completed)]
+    logger.info(f"{len(completed)} puns already completed, {len(df_todo)} to go")
+
+    # spread the Datamuse rate limit over all processes
+    max_requests_per_second = rate_limiter.max_requests_per_second / n_shards
+
+    with ProcessPoolExecutor(max_workers=n_shards) as executor:
+        futures = [
+            executor.submit(
+                generate_hints_shard,
+                df_todo.iloc[i::n_shards],
+                checkpoint_path=os.path.join(
+                    checkpoint_dir, CHECKPOINT_PATTERN.replace('*', f'{i:03d}')
+                    ),
+                max_workers=max_workers,
+                word_index=word_index,
+                max_requests_per_second=max_requests_per_second,
+                seed=seed,
+                rank_index=rank_index
+            )
+            for i in range(n_shards)
+            ]
+        for future in futures:
+            future.result()
 
-    # format hints
-    df_all_hints['defs'] = df_all_hints.apply(lambda x: sanitize_hints(x), axis=1)
+    # merge all shards, in puns order
+    completed = read_checkpoints(checkpoint_dir)
+    all_hints = [
+        record
+        for master_id in df_puns['id'] if master_id in completed
+        for record in completed[master_id]
+        ]
+    return pd.DataFrame(all_hints)
 
-    return df_all_hints
 
 if __name__ == "__main__":
 
     # get list of puns
     # change path to
     path = '~/code/badrbmb/jumble/data/ideas_puns.csv'
-    df_puns = pd.read_csv(path)
+    df_puns = load_puns(path)
 
     logger.info("Generate hints: START")
 
-    df_all_hints = generate_all_hints(df_puns)
+    # checkpoints are kept so that an interrupted run can be resumed
+    checkpoint_dir = os.path.expanduser('~/code/badrbmb/jumble/data/hints_checkpoints')
+    df_all_hints = generate_all_hints_sharded(df_puns, checkpoint_dir=checkpoint_dir)
+
+    # save hints with typed columns, use a .csv path for the legacy format
+    out_path = '~/code/badrbmb/jumble/data/hints.parquet'
+    save_hints(df_all_hints, out_path)
 
-    # save hints to csv
-    out_path = '~/code/badrbmb/jumble/data/hints.csv'
-    df_all_hints.to_csv(out_path, index=0)
+    if response_cache is not None:
+        logger.info(f"Datamuse cache stats: {response_cache.stats()}")
 
     logger.info("Generate hints: OVER")
@@ -0,0 +1,108 @@
+"""
+Cache of the game images.
+
+Images are downloaded once, resized to the width they are displayed at and
+kept both in memory and on disk, so that app reruns of the same game do not
+download the picture again.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from io import BytesIO
+from typing import Optional
+
+import requests
+from PIL import Image
+
+from jumble.cache import LRUCache
+
+# width the images are displayed at in the app
+IMAGE_WIDTH = 300
+IMAGE_CACHE_SIZE = 256
+# seconds, images never change for a given url
+IMAGE_CACHE_TTL = 24 * 3600.0
+# seconds to wait for the image server
+IMAGE_TIMEOUT = 10
+IMAGE_CACHE_DIR = os.environ.get(
+    "IMAGE_CACHE_DIR", os.path.join(tempfile.gettempdir(), 'jumble-images')
+    )
+
+
+class ImageCache:
+    """In-memory LRU of resized images, backed by thumbnails saved on disk"""
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = IMAGE_CACHE_DIR,
+        width: int = IMAGE_WIDTH,
+        max_size: int = IMAGE_CACHE_SIZE,
+        ttl: float = IMAGE_CACHE_TTL,
+        timeout: float = IMAGE_TIMEOUT
+    ):
+        self.cache_dir = cache_dir
+        self.width = width
+        self.timeout = timeout
+        self._memory = LRUCache(max_size=max_size, ttl=ttl)
+        self._local = threading.local()
+
+    def _get_http_session(self) -> requests.Session:
+        """Get a http session for the current thread, reusing its connections"""
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _get_path(self, url: str) -> Optional[str]:
+        if self.cache_dir is None:
+            return None
+        key = hashlib.sha256(f'{url}-{self.width}'.encode()).hexdigest()
+        return os.path.join(self.cache_dir, f'{key}.png')
+
+    def _resize(self, image: Image.Image) -> Image.Image:
+        """Resize to the display width, keeping the aspect ratio"""
+        if image.width <= self.width:
+            return image
+        height = round(image.height * self.width / image.width)
+        return image.resize((self.width, height), Image.LANCZOS)
+
+    def _download(self, url: str) -> Image.Image:
+        response = self._get_http_session().get(url, timeout=self.timeout)
+        response.raise_for_status()
+        image = Image.open(BytesIO(response.content))
+        image.load()
+        return self._resize(image)
+
+    def _save(self, image: Image.Image, path: str):
+        # created on first save, importing the module leaves the disk alone
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write then rename, so that readers never see a partial file
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        image.save(tmp_path, format='PNG')
+        os.replace(tmp_path, path)
+
+    def get(self, url: str) -> Image.Image:
+        """Get the resized image at url, from memory, disk or the network"""
+        image = self._memory.get(url)
+        if image is not None:
+            return image
+
+        path = self._get_path(url)
+        if path is not None and os.path.exists(path):
+            image = Image.open(path)
+            image.load()
+        else:
+            image = self._download(url)
+            if path is not None:
+                self._save(image, path)
+
+        self._memory.set(url, image)
+        return image
+
+    def clear(self):
+        """Drop the images kept in memory"""
+        self._memory.clear()
+
+
+# shared image cache for the running process
+image_cache = ImageCache()
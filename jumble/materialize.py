@@ -0,0 +1,23 @@
+"""
+Precompute ready to serve games, per difficulty level.
+
+Games are stored in the `game_snapshots` table with the shape of
+`Game.to_dict()`. Servers take them in batches into their in-process
+`snapshot_pool`, so that `Game(use_snapshots=True)` only has to pop one.
+"""
+
+from jumble import crud, schemas
+from jumble.database import SessionLocal
+from jumble.game import materialize_snapshots
+
+# number of games kept in the table per difficulty level
+SNAPSHOT_TABLE_SIZE = 2000
+
+
+if __name__ == "__main__":
+
+    with SessionLocal() as db:
+        for level in schemas.DifficultyLevel:
+            n_missing = SNAPSHOT_TABLE_SIZE - crud.count_game_snapshots(db, level=level)
+            n_created = materialize_snapshots(db, level=level, n_snapshots=max(n_missing, 0))
+            print(f'Materialized {n_created} games at level: {level.value}')
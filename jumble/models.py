@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, String
+from sqlalchemy import JSON, Column, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import relationship, declarative_base
 
 Base = declarative_base()
@@ -16,7 +16,7 @@ class MasterWord(Base):
     # Columns
     id = Column(Integer, primary_key=True, nullable=False)
     to_complete = Column(String, nullable=False, unique=True)
-    solution = Column(String, nullable=False)
+    solution = Column(String, nullable=False, index=True)
     dialogue = Column(String, nullable=False)
     image_url= Column(String, nullable=False)
 
@@ -35,7 +35,7 @@ class Jumble(Base):
     # Columns
     id = Column(Integer, primary_key=True, nullable=False)
     master_word_id = Column(
-        Integer, ForeignKey("master_words.id"), nullable=False
+        Integer, ForeignKey("master_words.id"), nullable=False, index=True
         )
 
     # Relationships
@@ -52,6 +52,10 @@ class JumbleOption(Base):
 
     # Table name
     __tablename__ = "jumble_options"
+    # options are only ever read by jumble and difficulty level
+    __table_args__ = (
+        Index("ix_jumble_options_jumble_id_level", "jumble_id", "level"),
+    )
 
         # Columns
     id = Column(Integer, primary_key=True, nullable=False)
@@ -71,3 +75,23 @@ class JumbleOption(Base):
     jumble = relationship(
         "Jumble", back_populates="jumble_options"
         )  # query "JumbleOption.jumble"
+
+
+class GameSnapshot(Base):
+    """Class to represent the game snapshots table, a pool of ready to serve games"""
+
+    # Table name
+    __tablename__ = "game_snapshots"
+    # snapshots are popped by difficulty level, oldest first
+    __table_args__ = (
+        Index("ix_game_snapshots_level_id", "level", "id"),
+    )
+
+    # Columns
+    id = Column(Integer, primary_key=True, nullable=False)
+    master_word_id = Column(
+        Integer, ForeignKey("master_words.id"), nullable=False
+        )
+    level = Column(String, nullable=False)
+    # same shape as `Game.to_dict()`
+    payload = Column(JSON, nullable=False)
@@ -1,14 +1,22 @@
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Tuple
+
 import pandas as pd
 from sqlalchemy.orm import Session
 
 from jumble import crud, models
 from jumble.database import SessionLocal
+from jumble.datasets import iter_hints, iter_puns, join_defs
+
+
+JUMBLE_OPTION_COLUMNS = ['word', 'score', 'defs', 'level', 'placeholder']
 
 
 def create_jumble_options(row_h: pd.Series):
     """Create jumble options from pd.Series"""
-    new_jumble_option = dict(row_h[['word', 'score', 'defs', 'level', 'placeholder']])
-    # make sure no comma seperate valeus exist in defs
+    new_jumble_option = dict(row_h[JUMBLE_OPTION_COLUMNS])
+    # defs are stored one per line
+    new_jumble_option['defs'] = join_defs(new_jumble_option['defs'])
     return models.JumbleOption(**new_jumble_option)
 
 
@@ -34,6 +42,178 @@ def create_master_word(row: pd.Series, df_hints: pd.DataFrame):
     return new_master
 
 
+def group_jumble_options(df_options: pd.DataFrame) -> Dict[int, List[List[dict]]]:
+    """Group jumble option records by master id then by hint, in hint order"""
+
+    df = df_options[['master_id', 'hint'] + JUMBLE_OPTION_COLUMNS]
+    # native python values, with None for missing ones
+    df = df.astype(object).where(pd.notnull(df), None)
+
+    grouped = defaultdict(lambda: defaultdict(list))
+    for record in df.to_dict('records'):
+        master_id = record.pop('master_id')
+        hint = record.pop('hint')
+        record['defs'] = join_defs(record['defs'])
+        grouped[master_id][hint].append(record)
+
+    return {
+        master_id: [jumbles[hint] for hint in sorted(jumbles)]
+        for master_id, jumbles in grouped.items()
+        }
+
+
+def select_new_master_words(
+    master_words: list, solutions: List[str], db: Session
+    ) -> list:
+    """
+    Keep master words whose solution is neither in the db nor repeated earlier
+    in the list, so that re-running the populator only inserts new content
+    """
+    seen = crud.read_existing_solutions(db, solutions=solutions)
+    if len(seen) > 0:
+        print(f'Found {len(seen)} in db, dropping ...')
+
+    new_master_words = []
+    for master_word, solution in zip(master_words, solutions):
+        if solution not in seen:
+            seen.add(solution)
+            new_master_words.append(master_word)
+    return new_master_words
+
+
+def create_master_word_record(row: pd.Series, jumbles: List[List[dict]]) -> dict:
+    """Create a master word record, nesting its jumble options, for bulk insert"""
+
+    new_master = dict(row)
+    new_master.pop('id')
+    new_master['jumbles'] = jumbles
+    return new_master
+
+
+def bulk_create_master_words(
+    df_masters: pd.DataFrame, df_options: pd.DataFrame, db: Session,
+    batch_size: int = 500
+    ) -> List[int]:
+    """create new master words from dataframes using batched inserts"""
+
+    jumbles = group_jumble_options(df_options)
+
+    master_words = [
+        create_master_word_record(row, jumbles=jumbles.get(row['id'], []))
+        for _, row in df_masters.astype(object).iterrows()
+        ]
+
+    n_size = len(master_words)
+
+    # insert in db only new words
+    pushed = crud.bulk_create_master_words(
+        db,
+        master_words=select_new_master_words(
+            master_words, solutions=[t['solution'] for t in master_words], db=db
+            ),
+        batch_size=batch_size
+        )
+
+    print(f'Successfull insert of {len(pushed)}/{n_size} new rows!')
+    return pushed
+
+
+def iter_jumble_option_groups(
+    option_chunks: Iterable[pd.DataFrame]
+    ) -> Iterator[Tuple[int, List[List[dict]]]]:
+    """
+    Yield the jumbles of each master id from chunks of options sorted by
+    master id. Options of the last master id of a chunk are carried over to
+    the next one, as they may continue there.
+    """
+    carry = None
+    for df_chunk in option_chunks:
+        if carry is not None:
+            df_chunk = pd.concat([carry, df_chunk], ignore_index=True)
+        if len(df_chunk) == 0:
+            continue
+        if not df_chunk['master_id'].is_monotonic_increasing:
+            raise ValueError("Options must be sorted by master_id to be streamed")
+
+        is_last = df_chunk['master_id'] == df_chunk['master_id'].iloc[-1]
+        carry = df_chunk[is_last]
+        yield from group_jumble_options(df_chunk[~is_last]).items()
+
+    if carry is not None:
+        yield from group_jumble_options(carry).items()
+
+
+def iter_master_word_records(
+    master_chunks: Iterable[pd.DataFrame],
+    option_groups: Iterable[Tuple[int, List[List[dict]]]]
+    ) -> Iterator[dict]:
+    """
+    Merge master words and groups of options, both sorted by master id, into
+    master word records for bulk insert
+    """
+    option_groups = iter(option_groups)
+    group = next(option_groups, None)
+    last_id = None
+    for df_chunk in master_chunks:
+        for _, row in df_chunk.astype(object).iterrows():
+            if last_id is not None and row['id'] <= last_id:
+                raise ValueError("Master words must be sorted by id to be streamed")
+            last_id = row['id']
+
+            # options without a master word are ignored, as in the bulk path
+            while group is not None and group[0] < row['id']:
+                group = next(option_groups, None)
+
+            jumbles = []
+            if group is not None and group[0] == row['id']:
+                jumbles = group[1]
+                group = next(option_groups, None)
+            yield create_master_word_record(row, jumbles=jumbles)
+
+
+def stream_create_master_words(
+    master_chunks: Iterable[pd.DataFrame],
+    option_chunks: Iterable[pd.DataFrame],
+    db: Session,
+    batch_size: int = 500
+    ) -> List[int]:
+    """
+    create new master words from chunks of master words and options, both
+    sorted by master id, holding at most `batch_size` master words at once
+    """
+    records = iter_master_word_records(
+        master_chunks, option_groups=iter_jumble_option_groups(option_chunks)
+        )
+
+    n_size = 0
+    pushed = []
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == batch_size:
+            n_size += len(batch)
+            pushed += _flush_master_words(batch, db=db, batch_size=batch_size)
+            batch = []
+    n_size += len(batch)
+    pushed += _flush_master_words(batch, db=db, batch_size=batch_size)
+
+    print(f'Successfull insert of {len(pushed)}/{n_size} new rows!')
+    return pushed
+
+
+def _flush_master_words(master_words: List[dict], db: Session, batch_size: int) -> List[int]:
+    """Insert the master words whose solution is not yet in db"""
+    if len(master_words) == 0:
+        return []
+    return crud.bulk_create_master_words(
+        db,
+        master_words=select_new_master_words(
+            master_words, solutions=[t['solution'] for t in master_words], db=db
+            ),
+        batch_size=batch_size
+        )
+
+
 def create_master_words(
     df_masters: pd.DataFrame, df_options: pd.DataFrame, db: Session
     ):
@@ -46,22 +226,12 @@ def create_master_words(
 
     n_size = len(master_words)
 
-    # check is master words exist
-    existing_words = crud.read_master_words_by_solutions(
-        db, solutions=[t.solution for t in master_words]
-        )
-    if len(existing_words) > 0:
-        # handle update
-        print(f'Found {len(existing_words)} in db, dropping ...')
-        existing_solutions = [t.solution for t in master_words]
-    else:
-        existing_solutions = []
-
     # insert in db only new words
     pushed = [
         crud.create_master_word_orm(new_master_word=u, db=db)
-        for u in master_words
-        if u.solution not in existing_solutions
+        for u in select_new_master_words(
+            master_words, solutions=[t.solution for t in master_words], db=db
+            )
         ]
 
     print(f'Successfull insert of {len(pushed)}/{n_size} new rows!')
@@ -71,18 +241,14 @@ def create_master_words(
 
 if __name__ == "__main__":
 
-    # load material from csvs
-
+    # load material, csv files are still supported
     path_masters = '~/code/badrbmb/jumble/data/ideas_puns.csv'
-    path_options = '~/code/badrbmb/jumble/data/hints.csv'
-
-    df_masters = pd.read_csv(path_masters)
-    df_options = pd.read_csv(path_options)
-
-    # replace all delimiter `,`  by ;
-    df_options['defs'] = df_options['defs'].replace(',', ';', regex=True)
+    path_options = '~/code/badrbmb/jumble/data/hints.parquet'
 
+    # both files are streamed, sorted by master id
     with SessionLocal() as db:
-        new_words = create_master_words(
-            df_masters=df_masters, df_options=df_options, db=db
+        new_words = stream_create_master_words(
+            master_chunks=iter_puns(path_masters),
+            option_chunks=iter_hints(path_options),
+            db=db
             )
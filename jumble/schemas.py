@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from enum import Enum
+from typing import List, Optional
 
 # Difficulty section
 
@@ -16,6 +17,12 @@ class JumbleOptionScoreSort(Enum):
     score_dsc = "Descending"
     rdn = "Random"
 
+# Random master word pick section
+
+class RandomPickStrategy(Enum):
+    id_range = "Id range"
+    order_by_random = "Order by random"
+
 # Master word section
 
 class MasterWordBase(BaseModel):
@@ -58,7 +65,7 @@ class Jumble(JumbleBase):
 class JumbleOptionBase(BaseModel):
     word: str
     score: int
-    defs: str
+    defs: Optional[str]
     level: str
     placeholder: str
 
@@ -74,3 +81,21 @@ class JumbleOption(JumbleOptionBase):
 
     class Config:
         orm_mode = True
+
+
+# Puzzle section
+
+class JumblePuzzle(Jumble):
+    jumble_options: List[JumbleOption]
+
+    class Config:
+        orm_mode = True
+        allow_mutation = False
+
+
+class MasterWordPuzzle(MasterWord):
+    jumbles: List[JumblePuzzle]
+
+    class Config:
+        orm_mode = True
+        allow_mutation = False
@@ -0,0 +1,103 @@
+import os
+import threading
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+# engines are created lazily, tests bind the sessions to their own one
+os.environ.setdefault("POSTGRES_DATABASE_URL", "sqlite://")
+
+from jumble import models, populator
+from jumble.cache import catalog
+from jumble.database import AsyncSessionLocal, SessionLocal
+
+DATA_DIR = Path(__file__).parents[1] / 'data'
+
+
+@pytest.fixture(scope='session')
+def engine(tmp_path_factory):
+    """SQLite db populated with the sample puns and hints"""
+    path = tmp_path_factory.mktemp('db') / 'jumble.db'
+    engine = create_engine(f'sqlite:///{path}')
+    models.Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        populator.bulk_create_master_words(
+            df_masters=pd.read_csv(DATA_DIR / 'ideas_puns.csv'),
+            df_options=pd.read_csv(DATA_DIR / 'hints.csv'),
+            db=db
+            )
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine, monkeypatch):
+    """Session on the sample db, `SessionLocal` and the catalog being bound to it"""
+    monkeypatch.setattr(SessionLocal, 'get_bind', lambda: engine)
+    catalog.invalidate()
+    with SessionLocal() as db:
+        yield db
+    catalog.invalidate()
+
+
+@pytest.fixture
+def async_db(engine, db, monkeypatch):
+    """Bind `AsyncSessionLocal` to the sample db"""
+    # connections are not pooled, as each test runs its own event loop
+    async_engine = create_async_engine(
+        engine.url.set(drivername='sqlite+aiosqlite'), poolclass=NullPool
+        )
+    monkeypatch.setattr(AsyncSessionLocal, 'get_bind', lambda: async_engine)
+    yield async_engine
+
+
+@pytest.fixture
+def statements(engine):
+    """List of the statements run on the sample db while the test runs, with their parameters"""
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, *args):
+        executed.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    yield executed
+    event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+@pytest.fixture
+def empty_db(tmp_path):
+    """Session on a new db with empty tables"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+    models.Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        yield db
+    engine.dispose()
+
+
+@pytest.fixture
+def stub_server():
+    """
+    Start local http servers answering with a request handler class, stopped
+    after the test. Handlers append to `server.requests`
+    """
+    servers = []
+
+    def start(handler) -> ThreadingHTTPServer:
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        server.daemon_threads = True
+        server.requests = []
+        server.url = f'http://127.0.0.1:{server.server_port}'
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
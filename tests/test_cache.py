@@ -0,0 +1,55 @@
+from jumble import cache, schemas
+from jumble.cache import LRUCache
+from jumble.game import Game
+
+LEVEL = schemas.DifficultyLevel.easy
+
+
+class Clock:
+    """Stand-in for the `time` module, moved forward by hand"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+def test_lru_cache_evicts_least_recently_used():
+    lru = LRUCache(max_size=2)
+    lru.set('a', 1)
+    lru.set('b', 2)
+    # read back, so no longer the least recently used
+    assert lru.get('a') == 1
+
+    lru.set('c', 3)
+
+    assert len(lru) == 2
+    assert lru.get('b') is None
+    assert lru.get('a') == 1
+    assert lru.get('c') == 3
+
+
+def test_lru_cache_entries_expire_after_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, 'time', clock)
+    lru = LRUCache(ttl=60)
+    lru.set('a', 1)
+
+    clock.now = 60
+    assert lru.get('a') == 1
+    clock.now = 61
+    assert lru.get('a', default='expired') == 'expired'
+    assert len(lru) == 0
+
+
+def test_game_on_warm_catalog_reads_no_db(db, statements):
+    first = Game(to_exclude=[], difficulty_level=LEVEL, seed=0)
+    statements.clear()
+
+    second = Game(to_exclude=[], difficulty_level=LEVEL, seed=0)
+    replayed = Game(to_exclude=[], difficulty_level=LEVEL, master_word_id=first.game_id)
+
+    assert second.to_dict() == first.to_dict()
+    assert replayed.game_id == first.game_id
+    assert statements == []
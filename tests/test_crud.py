@@ -0,0 +1,192 @@
+import random
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event, select
+
+from jumble import crud, models, schemas
+from jumble.game import Game
+
+
+def test_game_without_cache_query_count(db, statements):
+    game = Game(
+        to_exclude=[], difficulty_level=schemas.DifficultyLevel.easy, use_cache=False
+        )
+
+    assert game.game_id is not None
+    assert len(game.jumbles) > 0
+    # id bounds, master word with its jumbles, then their options at the level
+    assert len(statements) == 3
+
+
+def test_rnd_master_word_is_uniform_around_excluded_ids(db):
+    ids = crud.read_master_word_ids(db)
+    exclude_ids = ids[:5]
+    rng = random.Random(0)
+
+    counts = Counter(
+        crud.read_rnd_master_word(db, exclude_ids=exclude_ids, rng=rng).id
+        for _ in range(100 * (len(ids) - 5))
+        )
+
+    assert set(counts) == set(ids[5:])
+    # the id right after the excluded run is not favoured
+    assert max(counts.values()) < 150
+    assert min(counts.values()) > 50
+
+
+def test_rnd_master_word_all_but_one_excluded(db):
+    ids = crud.read_master_word_ids(db)
+
+    for strategy in schemas.RandomPickStrategy:
+        master_word = crud.read_rnd_master_word(
+            db, exclude_ids=ids[:-1], strategy=strategy, rng=random.Random(0)
+            )
+        assert master_word.id == ids[-1]
+        assert crud.read_rnd_master_word(db, exclude_ids=ids, strategy=strategy) is None
+
+
+@contextmanager
+def recorded_statements(conn):
+    """List of the statements run on a connection, with their parameters"""
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, *args):
+        executed.append((statement, parameters))
+
+    event.listen(conn, 'before_cursor_execute', before_cursor_execute)
+    yield executed
+    event.remove(conn, 'before_cursor_execute', before_cursor_execute)
+
+
+def explain_query_plan(db, statement, parameters) -> str:
+    return '\n'.join(
+        row[-1] for row in db.connection().exec_driver_sql(
+            f'EXPLAIN QUERY PLAN {statement}', parameters
+            )
+        )
+
+
+def test_rnd_jumble_options_use_jumble_id_level_index(db, statements):
+    """
+    Index use on the sample db, where a full scan would be as cheap, see
+    `test_rnd_jumble_options_use_index_at_scale` for the plan on 1M options
+    """
+    jumble_ids = [t.id for t in crud.read_jumbles(db, limit=5)]
+    statements.clear()
+
+    options = crud.read_rnd_jumble_options(
+        db, jumble_ids=jumble_ids, level=schemas.DifficultyLevel.medium
+        )
+
+    assert sorted(t.jumble_id for t in options) == sorted(jumble_ids)
+    assert all(t.level == schemas.DifficultyLevel.medium.value for t in options)
+    assert len(statements) == 1
+    plan = explain_query_plan(db, *statements[0])
+    assert 'USING INDEX ix_jumble_options_jumble_id_level' in plan
+
+
+@pytest.fixture
+def scored_jumble(db):
+    """Jumble with tied scores at the easy level, rolled back after the test"""
+    master_word = crud.read_master_words(db, limit=1)[0]
+    jumble = models.Jumble(master_word_id=master_word.id)
+    jumble.jumble_options = [
+        models.JumbleOption(
+            word=word, score=score, defs=None, level=level.value, placeholder='?' * len(word)
+            )
+        for word, score, level in [
+            ('lower', 10, schemas.DifficultyLevel.easy),
+            ('tied', 10, schemas.DifficultyLevel.easy),
+            ('upper', 30, schemas.DifficultyLevel.easy),
+            ('also', 30, schemas.DifficultyLevel.easy),
+            ('middle', 20, schemas.DifficultyLevel.easy),
+            ('hard', 100, schemas.DifficultyLevel.hard),
+            ]
+        ]
+    db.add(jumble)
+    db.flush()
+    yield jumble
+    db.rollback()
+
+
+def test_single_jumble_option_sort(db, scored_jumble):
+    def read(order, level=schemas.DifficultyLevel.easy):
+        return crud.read_single_jumble_option(
+            db, jumble_id=scored_jumble.id, level=level, order=order
+            )
+
+    # ties are broken by the lowest id
+    assert read(schemas.JumbleOptionScoreSort.score_asc).word == 'lower'
+    assert read(schemas.JumbleOptionScoreSort.score_dsc).word == 'upper'
+
+    easy_words = {'lower', 'tied', 'upper', 'also', 'middle'}
+    picked = {read(schemas.JumbleOptionScoreSort.rdn).word for _ in range(50)}
+    assert picked <= easy_words
+    assert len(picked) > 1
+
+    for order in schemas.JumbleOptionScoreSort:
+        assert read(order, level=schemas.DifficultyLevel.hard).word == 'hard'
+        assert read(order, level=schemas.DifficultyLevel.medium) is None
+        assert crud.read_single_jumble_option(
+            db, jumble_id=-1, level=schemas.DifficultyLevel.easy, order=order
+            ) is None
+
+
+@pytest.mark.parametrize('read', [
+    crud.read_existing_solutions,
+    lambda db, **kwargs: {t.solution for t in crud.read_master_words_by_solutions(db, **kwargs)}
+    ], ids=['existing_solutions', 'master_words_by_solutions'])
+def test_solution_lookups_are_chunked(db, statements, read):
+    solutions = db.execute(select(models.MasterWord.solution).limit(5)).scalars().all()
+    statements.clear()
+
+    found = read(db, solutions=solutions + ['not a solution'], chunk_size=2)
+
+    assert found == set(solutions)
+    assert len(statements) == 3
+    assert all(len(parameters) <= 2 for _, parameters in statements)
+
+
+@pytest.mark.slow
+def test_rnd_jumble_options_use_index_at_scale(empty_db):
+    """Same as `test_rnd_jumble_options_use_jumble_id_level_index`, on 1M options"""
+    n_jumbles, n_options = 100_000, 10
+    levels = [t.value for t in schemas.DifficultyLevel]
+    conn = empty_db.connection()
+    conn.exec_driver_sql(
+        'INSERT INTO jumbles (id, master_word_id) VALUES (?, 1)',
+        [(i, ) for i in range(1, n_jumbles + 1)]
+        )
+    conn.exec_driver_sql(
+        'INSERT INTO jumble_options (jumble_id, word, score, defs, level, placeholder) '
+        "VALUES (?, 'word', ?, NULL, ?, '?o??')",
+        [
+            (i, k, levels[k % len(levels)])
+            for i in range(1, n_jumbles + 1) for k in range(n_options)
+            ]
+        )
+    conn.exec_driver_sql('ANALYZE')
+    jumble_ids = random.Random(0).sample(range(1, n_jumbles + 1), 5)
+
+    start = time.perf_counter()
+    full_scan = conn.exec_driver_sql(
+        'SELECT count(*) FROM jumble_options NOT INDEXED WHERE level = ?', (levels[1], )
+        ).scalar()
+    full_scan_time = time.perf_counter() - start
+    # statement compiled once, so that only its execution is timed
+    crud.read_rnd_jumble_options(empty_db, jumble_ids=jumble_ids, level=schemas.DifficultyLevel.medium)
+    with recorded_statements(conn) as statements:
+        start = time.perf_counter()
+        options = crud.read_rnd_jumble_options(
+            empty_db, jumble_ids=jumble_ids, level=schemas.DifficultyLevel.medium
+            )
+        elapsed = time.perf_counter() - start
+
+    # options 1, 4 and 7 of each jumble
+    assert full_scan == 3 * n_jumbles
+    assert sorted(t.jumble_id for t in options) == sorted(jumble_ids)
+    assert 'USING INDEX ix_jumble_options_jumble_id_level' in explain_query_plan(empty_db, *statements[0])
+    assert elapsed < full_scan_time / 10
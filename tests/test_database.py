@@ -0,0 +1,68 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+
+from jumble import database
+
+ROOT_DIR = Path(__file__).parents[1]
+
+
+def run_python(code: str, **env) -> str:
+    """Run code in a new interpreter, with the given environment variables only"""
+    env = {k: v for k, v in os.environ.items() if not k.startswith(('POSTGRES_', 'DB_'))} | env
+    return subprocess.run(
+        [sys.executable, '-c', code], env=env, cwd=ROOT_DIR,
+        capture_output=True, text=True, check=True
+        ).stdout
+
+
+def test_import_needs_no_database_url():
+    out = run_python(
+        "import jumble.game, jumble.populator, jumble.materialize\n"
+        "from jumble import database\n"
+        "print(database._engine is None, database.get_pool_stats())"
+        )
+
+    assert out.split() == ['True', '{}']
+
+
+def test_pool_settings_from_environment(tmp_path):
+    out = run_python(
+        "import json\n"
+        "from jumble.database import get_engine\n"
+        "pool = get_engine().pool\n"
+        "print(json.dumps([pool.size(), pool._max_overflow, pool._recycle, pool._pre_ping, pool._timeout]))",
+        POSTGRES_DATABASE_URL=f"sqlite:///{tmp_path / 'env.db'}",
+        DB_POOL_SIZE='3', DB_MAX_OVERFLOW='2', DB_POOL_RECYCLE='60',
+        DB_POOL_PRE_PING='false', DB_POOL_TIMEOUT='1.5'
+        )
+
+    assert json.loads(out) == [3, 2, 60, False, 1.5]
+
+
+def test_pool_stats(tmp_path, monkeypatch, caplog):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", poolclass=database.TimedQueuePool,
+        pool_size=2, max_overflow=1
+        )
+    monkeypatch.setattr(database, '_engine', engine)
+
+    with engine.connect() as conn:
+        conn.execute(text('SELECT 1'))
+        stats = database.get_pool_stats()
+    with caplog.at_level(logging.INFO, logger=database.__name__):
+        database.log_pool_stats()
+    engine.dispose()
+
+    assert list(stats) == ['sync']
+    assert stats['sync']['checked_out'] == 1
+    assert stats['sync']['checkouts'] == 1
+    assert stats['sync']['overflow'] == 0
+    assert stats['sync']['size'] == 2
+    assert stats['sync']['avg_wait_time'] == stats['sync']['wait_time'] >= 0
+    assert 'sync db pool' in caplog.text
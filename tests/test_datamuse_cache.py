@@ -0,0 +1,100 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from jumble import datamuse_cache
+from jumble.datamuse_cache import DatamuseCache
+
+
+class Clock:
+    """Stand-in for the `time` module, moved forward by hand"""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(datamuse_cache, 'time', clock)
+    return clock
+
+
+def response(hint: str) -> list:
+    return [{'word': hint.replace('?', 'a'), 'score': 1}]
+
+
+def test_responses_expire_after_ttl(tmp_path, clock):
+    cache = DatamuseCache(str(tmp_path / 'cache.sqlite'), ttl=60)
+    cache.set('?r?f', 1000, response('?r?f'))
+
+    clock.now += 59
+    assert cache.get('?r?f', 1000) == response('?r?f')
+    clock.now += 2
+    assert cache.get('?r?f', 1000) is None
+
+    cache.evict()
+    assert len(cache) == 0
+
+
+def test_least_recently_used_responses_are_evicted(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(datamuse_cache, 'EVICTION_INTERVAL', 1)
+    cache = DatamuseCache(str(tmp_path / 'cache.sqlite'), max_entries=3)
+
+    for hint in ('a??', 'b??', 'c??'):
+        clock.now += 1
+        cache.set(hint, 1000, response(hint))
+    clock.now += 1
+    # read back, so no longer the least recently used
+    cache.get('a??', 1000)
+    clock.now += 1
+    cache.set('d??', 1000, response('d??'))
+
+    assert len(cache) == 3
+    assert cache.get('b??', 1000) is None
+    assert all(cache.get(t, 1000) is not None for t in ('a??', 'c??', 'd??'))
+
+
+def test_stats_count_hits_and_misses(tmp_path):
+    cache = DatamuseCache(str(tmp_path / 'cache.sqlite'))
+    cache.set('?r?f', 1000, response('?r?f'))
+
+    cache.get('?r?f', 1000)
+    cache.get('?r?f', 1000)
+    # same pattern with another max words is another response
+    cache.get('?r?f', 10)
+
+    assert cache.stats() == {'hits': 2, 'misses': 1, 'hit_rate': 2 / 3, 'entries': 1}
+
+
+def test_file_is_shared_across_instances(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    writer, reader = DatamuseCache(path), DatamuseCache(path)
+
+    writer.set('?r?f', 1000, response('?r?f'))
+
+    assert reader.get('?r?f', 1000) == response('?r?f')
+    assert reader.stats()['hits'] == 1
+    assert writer.stats()['hits'] == 0
+
+
+def fill_cache(path: str, worker: int) -> int:
+    cache = DatamuseCache(path)
+    for i in range(50):
+        cache.set(f'{worker}?{i}', 1000, response(f'{worker}?{i}'))
+    return len(cache)
+
+
+def test_file_is_shared_across_processes(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    DatamuseCache(path)
+
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        list(executor.map(fill_cache, [path] * 4, range(4)))
+
+    cache = DatamuseCache(path)
+    assert len(cache) == 200
+    assert cache.get('3?49', 1000) == response('3?49')
@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+from jumble.datasets import HINTS_DTYPES, load_hints, save_hints
+
+
+@pytest.fixture
+def df_hints():
+    return pd.DataFrame({
+        'word': ['trefoil', 'traffic', 'cold', 'colt'],
+        'score': [687, 1452, 20, 3],
+        'defs': [['adj\t(heraldry) tréflé', 'n\ta plant'], None, ['n\tlow temperature'], []],
+        'defHeadword': ['trefoiled', 'traffic', 'cold', 'colt'],
+        'level': ['Tough nut to crack', 'Walk in the park', 'Wee bit of a challenge', 'Tough nut to crack'],
+        'placeholder': ['?r?f?i?', '?r?f?i?', '?o??', '?o??'],
+        'hint': [1, 1, 2, 2],
+        # not sorted, hints are saved sorted by master id
+        'master_id': [2, 2, 1, 1]
+        })
+
+
+@pytest.mark.parametrize('suffix', ['parquet', 'feather', 'csv'])
+def test_hints_round_trip(tmp_path, df_hints, suffix):
+    path = tmp_path / f'hints.{suffix}'
+
+    save_hints(df_hints, path)
+    loaded = load_hints(path)
+
+    expected = df_hints.iloc[[2, 3, 0, 1]].reset_index(drop=True).astype(HINTS_DTYPES)
+    if suffix == 'csv':
+        # an empty list of definitions is an empty line
+        expected.at[1, 'defs'] = None
+    pd.testing.assert_frame_equal(loaded, expected)
+    assert loaded['level'].notna().all()
+
+
+@pytest.mark.parametrize('suffix', ['parquet', 'feather', 'csv'])
+def test_no_hints_round_trip(tmp_path, suffix):
+    path = tmp_path / f'hints.{suffix}'
+
+    # what the generator returns when no pun completed
+    save_hints(pd.DataFrame(), path)
+    loaded = load_hints(path)
+
+    assert len(loaded) == 0
+    assert {k: loaded.dtypes[k] for k in HINTS_DTYPES} == HINTS_DTYPES
@@ -0,0 +1,234 @@
+import asyncio
+import random
+
+import pytest
+
+from jumble import crud, schemas
+from jumble.cache import PuzzleCatalog, catalog
+from jumble.game import (CELL_CORRECT, CELL_MISSING, CELL_WRONG,
+                         EXCLUSION_ARRAY_MAX_SIZE, ExclusionSet, Game, GameState,
+                         GridChecker, SnapshotPool, materialize_snapshots)
+
+LEVEL = schemas.DifficultyLevel.easy
+
+
+def test_snapshot_pool_refills_from_table_then_builds(db):
+    pool = SnapshotPool(size=10, min_size=0)
+    assert materialize_snapshots(db, level=LEVEL, n_snapshots=4, rng=random.Random(0)) == 4
+
+    assert pool.refill(LEVEL) == 10
+    assert pool.count(LEVEL) == 10
+    assert crud.count_game_snapshots(db, level=LEVEL) == 0
+    assert pool.refill(LEVEL) == 0
+
+
+def test_snapshot_pool_pops_in_process(db, statements):
+    pool = SnapshotPool(size=10, min_size=0)
+    for game_id in (1, 2, 3):
+        pool.put(LEVEL, {'game_id': game_id})
+
+    assert pool.pop(LEVEL, exclude_ids={1, 3}) == {'game_id': 2}
+    assert pool.pop(LEVEL, exclude_ids={1, 3}) is None
+    assert pool.pop(schemas.DifficultyLevel.hard, exclude_ids=()) is None
+    assert pool.count(LEVEL) == 2
+    assert statements == []
+
+
+def test_game_from_snapshot_pool(db, monkeypatch):
+    pool = SnapshotPool(size=10, min_size=0)
+    pool.refill(LEVEL)
+    monkeypatch.setattr('jumble.game.snapshot_pool', pool)
+
+    game = Game(to_exclude=[], difficulty_level=LEVEL, use_snapshots=True)
+
+    assert game.game_id is not None
+    assert set(game.to_dict()) == {
+        'game_id', 'solution', 'jumbles', 'image_url', 'dialogue', 'to_complete'
+        }
+    assert pool.count(LEVEL) == 9
+
+
+@pytest.mark.parametrize('to_exclude', [[], ExclusionSet()], ids=['list', 'exclusion_set'])
+@pytest.mark.parametrize('use_snapshots', [False, True])
+def test_state_of_async_game_reads_no_db(async_db, statements, monkeypatch, use_snapshots, to_exclude):
+    pool = SnapshotPool(size=10, min_size=0)
+    pool.refill(LEVEL)
+    monkeypatch.setattr('jumble.game.snapshot_pool', pool)
+    # cold catalog, everything is read with the async engine
+    catalog.invalidate()
+    statements.clear()
+
+    game = asyncio.run(Game.create_async(
+        to_exclude=to_exclude, difficulty_level=LEVEL, use_snapshots=use_snapshots, seed=0
+        ))
+    state = GameState.from_game(game)
+
+    assert game.game_id is not None
+    assert state.to_dict() == game.to_dict()
+    assert statements == []
+    if isinstance(to_exclude, ExclusionSet) and not use_snapshots:
+        assert catalog.peek_master_word_ids() is not None
+
+
+def test_state_reads_its_puzzle_once_per_load(db, statements, monkeypatch):
+    # nothing stays cached, as with many live sessions evicting each other
+    monkeypatch.setattr('jumble.game.catalog', PuzzleCatalog(max_size=0))
+    state = GameState.from_game(Game(to_exclude=[], difficulty_level=LEVEL, seed=0))
+    statements.clear()
+
+    game = state.load()
+    content = (game.solution, game.image_url, game.dialogue, game.to_complete, game.jumbles)
+    grid = {t: list(data['solution']) for t, data in game.jumbles.items()}
+    check = state.check_grid(grid, solution_parts=game.solution.split(' '), game=game)
+
+    assert all(t is not None for t in content)
+    assert check.solution
+    # master word with its jumbles, then their options at the level
+    assert len(statements) == 2
+    assert GameState.loads(state.dumps()) == state
+
+
+def test_state_of_missing_master_word(db):
+    state = GameState(
+        game_id=10**9, difficulty_level=LEVEL, jumble_ids=(1, ), option_ids=(1, ), shuffled=('ab', )
+        )
+
+    game = state.load()
+
+    assert game.game_id is None
+    assert game.solution is None
+    assert game.jumbles is None
+
+
+def test_exclusion_set_size_follows_ids_played():
+    played = ExclusionSet([1_000_000])
+
+    assert 1_000_000 in played
+    assert 999_999 not in played
+    assert played.nbytes() < 16
+
+
+@pytest.mark.parametrize('n_ids', [3, EXCLUSION_ARRAY_MAX_SIZE + 10])
+def test_exclusion_set_round_trip(n_ids):
+    ids = random.Random(0).sample(range(2_000_000), n_ids) + [0, 65_535, 65_536]
+    played = ExclusionSet(ids)
+    played.add(ids[0])
+    # dense chunk turned into a bitmap
+    dense = ExclusionSet(range(EXCLUSION_ARRAY_MAX_SIZE + 1))
+
+    assert len(played) == len(set(ids))
+    assert list(played) == sorted(set(ids))
+    assert ExclusionSet.from_bytes(played.to_bytes()) == played
+    assert ExclusionSet.from_bytes(dense.to_bytes()) == dense
+    assert dense.nbytes() == 8192
+    assert played.copy() == played
+
+
+def test_exclusion_set_rejects_negative_ids():
+    played = ExclusionSet([7])
+
+    with pytest.raises(ValueError):
+        played.add(-1)
+    with pytest.raises(ValueError):
+        ExclusionSet.from_bytes(played.to_bytes()[:-1])
+
+    assert -1 not in played
+    assert list(played) == [7]
+
+
+def test_exclusion_set_pick_random():
+    played = ExclusionSet(range(0, 1000, 2))
+    rng = random.Random(0)
+
+    assert all(played.pick_random(range(1000), rng=rng) % 2 for _ in range(20))
+    assert played.pick_random(range(0, 1000, 2), rng=rng) is None
+
+
+@pytest.fixture
+def checker():
+    # circled cells are the ones with a letter in the placeholder
+    return GridChecker({
+        2: {'solution': 'Cold', 'placeholder': '?o?d'},
+        1: {'solution': 'trefoil', 'placeholder': '?r?f?i?'}
+        }, solution='Stone cold')
+
+
+def test_grid_missing_and_wrong_cells(checker):
+    check = checker.check({1: ['t', 'x', '', 'F', 'o', 'i'], 2: ['c', 'O', 'l', 'd']})
+
+    assert check.jumbles == {
+        2: (CELL_CORRECT, ) * 4,
+        1: (CELL_CORRECT, CELL_WRONG, CELL_MISSING, CELL_CORRECT, CELL_CORRECT, CELL_CORRECT, CELL_MISSING)
+        }
+    assert check.solution is None
+
+
+def test_grid_circled_letters_in_grid_order(checker):
+    check = checker.check({1: list('trefoil'), 2: list('cold')})
+
+    # jumbles in the game order, then cells from left to right
+    assert check.circled_letters == ('o', 'd', 'r', 'f', 'i')
+
+
+def test_grid_jumbles_not_submitted_are_missing(checker):
+    check = checker.check({2: list('cold'), 3: list('extra')})
+
+    assert check.jumbles[1] == (CELL_MISSING, ) * 7
+    assert check.circled_letters == ('o', 'd')
+    assert set(check.jumbles) == {1, 2}
+
+
+@pytest.mark.parametrize('solution_parts, expected', [
+    ([' STONE', 'Cold  '], True),
+    (['stone', 'cold'], True),
+    (['stonecold'], False),
+    (['stone', 'colder'], False),
+    ([], False)
+    ])
+def test_grid_solution_ignores_case_and_whitespace(checker, solution_parts, expected):
+    assert checker.check({}, solution_parts=solution_parts).solution is expected
+
+
+def test_grid_solution_longer_than_its_placeholder():
+    checker = GridChecker({1: {'solution': 'trefoils', 'placeholder': '?r?f?i?'}}, solution='r f i')
+
+    check = checker.check({1: list('trefoils')})
+
+    # one cell per placeholder letter, extra letters are ignored
+    assert check.jumbles[1] == (CELL_CORRECT, ) * 7
+    assert check.circled_letters == ('r', 'f', 'i')
+
+
+def test_state_of_payload_without_option_ids(db, statements):
+    payload = Game(to_exclude=[], difficulty_level=LEVEL, seed=0).to_dict()
+    for jumble in payload['jumbles'].values():
+        del jumble['option_id']
+    statements.clear()
+
+    state = GameState.from_game(Game.from_payload(payload, LEVEL))
+
+    assert state == GameState(game_id=None, difficulty_level=LEVEL)
+    assert state.load().game_id is None
+    assert statements == []
+
+
+@pytest.mark.parametrize('pick', ['exclusion_set', 'master_word_id'])
+def test_seeded_game_is_the_same_with_or_without_cache(db, pick):
+    kwargs = {'to_exclude': ExclusionSet([1, 2]), 'difficulty_level': LEVEL}
+    if pick == 'master_word_id':
+        kwargs['master_word_id'] = 3
+
+    games = [Game(**kwargs, use_cache=use_cache, seed=7) for use_cache in (True, False, True)]
+
+    assert games[0].game_id is not None
+    assert games[0].to_dict() == games[1].to_dict() == games[2].to_dict()
+    assert Game(**kwargs, seed=8).to_dict() != games[0].to_dict()
+
+
+def test_seeded_game_without_cache_is_reproducible(db):
+    games = [
+        Game(to_exclude=[1, 2], difficulty_level=LEVEL, use_cache=False, seed=7)
+        for _ in range(2)
+        ]
+
+    assert games[0].to_dict() == games[1].to_dict()
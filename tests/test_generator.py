@@ -0,0 +1,369 @@
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pytest
+from tenacity import RetryError, wait_none
+
+from jumble import generator
+from jumble.datasets import load_puns
+
+DATA_DIR = Path(__file__).parents[1] / 'data'
+
+
+class DatamuseStub(BaseHTTPRequestHandler):
+    """
+    Emulate the Datamuse `/words` endpoint, answering `sp=` patterns with
+    made up words. `server.failures` lists how the next requests fail,
+    either `error` or `hang`
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        self.server.requests.append((time.monotonic(), query))
+        failure = self.server.failures.pop(0) if self.server.failures else None
+
+        if url.path != '/words' or 'sp' not in query:
+            self.send_error(404)
+            return
+        if failure == 'error':
+            self.send_error(503)
+            return
+        if failure == 'hang':
+            time.sleep(generator.DATAMUSE_TIMEOUT * 2)
+
+        pattern = query['sp'][0]
+        rng = random.Random(pattern)
+        words = []
+        for _ in range(min(int(query['max'][0]), 12)):
+            word = ''.join(t if t != '?' else rng.choice('aeioubcdlmnrst') for t in pattern)
+            words.append({
+                'word': word,
+                'score': rng.randint(1, 5000),
+                'defs': [f'n\tsome {word} definition']
+                })
+        body = json.dumps(words).encode()
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except OSError:
+            # the client gave up waiting
+            pass
+
+
+@pytest.fixture
+def datamuse(stub_server, monkeypatch):
+    """Local Datamuse stub, used by `generator.fetch_datamuse`"""
+    server = stub_server(DatamuseStub)
+    server.failures = []
+
+    monkeypatch.setattr(generator, 'DATAMUSE_URL', f'{server.url}/words')
+    monkeypatch.setattr(generator, 'DATAMUSE_TIMEOUT', 0.2)
+    monkeypatch.setattr(generator, 'response_cache', None)
+    monkeypatch.setattr(generator, 'rate_limiter', generator.HostRateLimiter(200))
+    monkeypatch.setattr(generator.fetch_datamuse.retry, 'wait', wait_none())
+    generator.fetch_datamuse.__wrapped__.cache_clear()
+    yield server
+    generator.fetch_datamuse.__wrapped__.cache_clear()
+
+
+def test_generate_all_hints_concurrently(datamuse):
+    df_puns = load_puns(DATA_DIR / 'ideas_puns.csv').head(4)
+
+    df_hints = generator.generate_all_hints(df_puns, max_workers=4, seed=0)
+
+    assert set(df_hints['master_id']) == set(df_puns['id'])
+    for word, placeholder in zip(df_hints['word'], df_hints['placeholder']):
+        assert len(word) == len(placeholder)
+        assert all(u in ('?', t) for t, u in zip(word, placeholder))
+    assert all(query['md'] == ['d'] for _, query in datamuse.requests)
+
+
+def test_fetch_retries_errors_and_timeouts(datamuse):
+    datamuse.failures = ['error', 'hang', 'error']
+
+    words = generator.fetch_datamuse('?r?f?i?')
+
+    assert len(words) > 0
+    assert len(datamuse.requests) == 4
+
+
+def test_fetch_gives_up_after_max_attempts(datamuse):
+    datamuse.failures = ['error'] * 5
+
+    with pytest.raises(RetryError):
+        generator.fetch_datamuse('?r?f?i?')
+    assert len(datamuse.requests) == 5
+
+
+def test_requests_are_rate_limited_per_host(datamuse, monkeypatch):
+    monkeypatch.setattr(generator, 'rate_limiter', generator.HostRateLimiter(20))
+
+    threads = [
+        threading.Thread(target=generator.fetch_datamuse, args=(f'?a?{t}?', ))
+        for t in 'bcdefg'
+        ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    timestamps = sorted(t for t, _ in datamuse.requests)
+    assert len(timestamps) == 6
+    # 20 requests per second at most
+    assert all(b - a > 0.04 for a, b in zip(timestamps, timestamps[1:]))
+
+
+def test_shard_checkpoints_each_pun_as_it_completes(tmp_path, monkeypatch):
+    df_puns = load_puns(DATA_DIR / 'ideas_puns.csv').head(4)
+    slow_id = df_puns['id'].iloc[0]
+    checkpoint_path = tmp_path / 'hints-shard-000.jsonl'
+    n_done_before_slow = []
+
+    def get_pun_hints(pun, **kwargs):
+        if pun['id'] == slow_id:
+            # wait for the other puns to be checkpointed
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                if checkpoint_path.exists() and len(checkpoint_path.read_text().splitlines()) == 3:
+                    break
+                time.sleep(0.01)
+            n_done_before_slow.append(
+                len(checkpoint_path.read_text().splitlines()) if checkpoint_path.exists() else 0
+                )
+        return pd.DataFrame({
+            'word': ['word'], 'defs': [['n\tsome definition']], 'master_id': [pun['id']]
+            })
+
+    monkeypatch.setattr(generator, 'get_pun_hints', get_pun_hints)
+
+    n_done = generator.generate_hints_shard(df_puns, checkpoint_path=str(checkpoint_path))
+
+    assert n_done == 4
+    assert n_done_before_slow == [3]
+    assert set(generator.read_checkpoints(str(tmp_path))) == set(df_puns['id'])
+
+
+@pytest.mark.parametrize('ordered', [True, False])
+def test_puns_in_flight_are_bounded(monkeypatch, ordered):
+    monkeypatch.setattr(generator, 'HINTS_BATCH_SIZE', 3)
+    df_puns = pd.DataFrame({'id': range(1, 41), 'solution': 'pun'})
+    started = []
+
+    def get_pun_hints(pun, **kwargs):
+        started.append(pun['id'])
+        return pd.DataFrame({
+            'word': ['word'], 'defs': [['n\tsome definition']], 'master_id': [pun['id']]
+            })
+
+    monkeypatch.setattr(generator, 'get_pun_hints', get_pun_hints)
+
+    n_consumed = 0
+    for df_hints in generator.iter_all_hints(df_puns, max_workers=2, ordered=ordered):
+        n_consumed += 1
+        # consumed puns, plus the ones submitted ahead
+        assert len(started) <= n_consumed + 2 * generator.MAX_PENDING_PER_WORKER
+    df_all_hints = generator.generate_all_hints(df_puns, max_workers=2)
+
+    assert n_consumed == 40
+    assert df_all_hints['master_id'].tolist() == df_puns['id'].tolist()
+
+
+@pytest.fixture(scope='module')
+def df_words():
+    rng = random.Random(0)
+    words = sorted({
+        ''.join(rng.choice('aeinrst') for _ in range(rng.randint(4, 7))) for _ in range(3000)
+        })
+    return pd.DataFrame({
+        'word': words,
+        'score': [rng.randint(1, 5000) for _ in words],
+        'defs': [[f'n\tdefinition of {t}'] if i % 5 else None for i, t in enumerate(words)]
+        })
+
+
+@pytest.fixture(scope='module')
+def word_index(df_words):
+    return generator.WordIndex(df_words)
+
+
+@pytest.mark.parametrize('pattern', ['?a?e', 'r??t?', '?n?s?e?', 'sssss', '??', 'A?E?'])
+def test_word_index_matches_regex_scan(df_words, word_index, pattern):
+    regex = re.compile(pattern.lower().replace('?', '.'))
+    expected = df_words[df_words['word'].map(lambda t: regex.fullmatch(t) is not None)]
+    expected = expected.sort_values('score', ascending=False, kind='stable')
+
+    words = word_index.query(pattern, max_words=len(df_words))
+
+    assert [t['word'] for t in words] == expected['word'].tolist()
+    assert [t['score'] for t in words] == expected['score'].tolist()
+    assert word_index.count(pattern) == len(expected)
+
+
+def test_word_index_caps_max_words(word_index):
+    words = word_index.query('?????', max_words=7)
+
+    assert len(words) == 7
+    assert words == word_index.query('?????', max_words=1000)[:7]
+    assert word_index.count('?????') > 7
+
+
+def test_word_index_keeps_best_scored_case_variant():
+    word_index = generator.WordIndex(pd.DataFrame({
+        'word': ['Apple', 'apple', 'APPLE', 'ample'],
+        'score': [10, 30, 20, 5],
+        'defs': [['n\tproper'], ['n\tfruit'], None, None]
+        }))
+
+    assert word_index.query('a?ple') == [
+        {'word': 'apple', 'score': 30, 'defs': ['n\tfruit']},
+        {'word': 'ample', 'score': 5}
+        ]
+    assert word_index.count('a?ple') == 2
+
+
+def test_hint_candidates_from_word_index(word_index, monkeypatch):
+    def make_datamuse_request(*args, **kwargs):
+        raise AssertionError("Datamuse is not queried with a word index")
+
+    monkeypatch.setattr(generator, 'make_datamuse_request', make_datamuse_request)
+
+    df = generator.get_hint_word_candidates(
+        'ae', word_index=word_index, rng=random.Random(0), rank_index=word_index
+        )
+
+    assert list(df.columns) == ['word', 'score', 'defs', 'level', 'placeholder']
+    assert len(df) >= generator.MIN_CANDIDATES
+    assert df['defs'].map(lambda t: isinstance(t, list) and len(t) > 0).all()
+    placeholder = df['placeholder'].iloc[0]
+    assert all(
+        len(word) == len(placeholder) and all(u in ('?', t) for t, u in zip(word, placeholder))
+        for word in df['word']
+        )
+    assert set(df['level']) <= set(generator.DIFFICULTY_LEVELS)
+
+
+def hint_positions(placeholder: str) -> list:
+    return [i for i, t in enumerate(placeholder) if t != '?']
+
+
+@pytest.mark.parametrize('n_letters, length', [(2, 4), (2, 5), (3, 5), (3, 6), (3, 7)])
+def test_placeholder_layouts_have_no_adjacent_letters(n_letters, length):
+    layouts = generator.get_placeholder_layouts(n_letters, length)
+
+    assert set(layouts) == {
+        t for t in itertools.combinations(range(length), n_letters)
+        if all(b - a > 1 for a, b in zip(t, t[1:]))
+        }
+
+
+@pytest.mark.parametrize('hint_letters', ['ab', 'abc', 'aab'])
+def test_hint_placeholders(hint_letters):
+    rng = random.Random(0)
+    placeholders = [generator.get_hint_placeholder(hint_letters, rng=rng) for _ in range(200)]
+
+    for placeholder in placeholders + generator.get_all_hint_placeholders(hint_letters):
+        positions = hint_positions(placeholder)
+        assert len(placeholder) in generator.get_hint_lengths(len(hint_letters))
+        assert all(b - a > 1 for a, b in zip(positions, positions[1:]))
+        assert sorted(placeholder[i] for i in positions) == sorted(hint_letters)
+    # all lengths get drawn
+    assert {len(t) for t in placeholders} == set(generator.get_hint_lengths(len(hint_letters)))
+
+
+def test_seeded_placeholders_are_reproducible(word_index):
+    for rank_index in (None, word_index):
+        draws = [
+            [
+                generator.get_hint_placeholder('ate', rng=rng, rank_index=rank_index)
+                for _ in range(20)
+                ]
+            for rng in (random.Random(1), random.Random(1))
+            ]
+        assert draws[0] == draws[1]
+
+
+@pytest.mark.parametrize('min_candidates', [1, 3, 10, 10_000])
+def test_ranked_placeholders_have_enough_candidates(word_index, min_candidates):
+    rng = random.Random(0)
+    counts = {t: word_index.count(t) for t in generator.get_all_hint_placeholders('ne')}
+
+    placeholders = {
+        generator.get_hint_placeholder(
+            'ne', rng=rng, rank_index=word_index, min_candidates=min_candidates
+            )
+        for _ in range(500)
+        }
+
+    likely = {t for t, count in counts.items() if count >= min_candidates}
+    assert placeholders == (likely or {max(counts, key=counts.get)})
+
+
+def test_ranked_placeholder_falls_back_to_best_one():
+    word_index = generator.WordIndex(pd.DataFrame({
+        'word': ['axbx', 'aybx', 'axxxb', 'bxaxx'], 'score': [1, 2, 3, 4], 'defs': None
+        }))
+
+    placeholder = generator.get_hint_placeholder(
+        'ab', rng=random.Random(0), rank_index=word_index, min_candidates=3
+        )
+
+    assert placeholder == 'a?b?'
+
+
+def baseline_to_drop(x, exclude_words=generator.EXCLUDE_WORDS) -> bool:
+    """`_to_drop` of the generator before the filter was vectorized"""
+    if x is None:
+        return True
+    cond = [any([i in t.lower() for t in x]) for i in exclude_words]
+    return any(cond)
+
+
+def test_defs_to_drop_match_baseline():
+    defs = [
+        t.split('\n') if isinstance(t, str) else None
+        for t in pd.read_csv(DATA_DIR / 'hints.csv')['defs']
+        ] + [
+        None, [], [''], ['n\tA SURNAME'], ['n\tgiven Name of a person', 'n\tplant'],
+        ['adj\tArchaic', 'n\tplant'], ['n\tinitialism'], ['n\tabbreviatioN'], ['v\tto run']
+        ]
+    # index as after filtering a Datamuse response, with repeated labels
+    defs = pd.Series(defs, index=[i // 2 for i in range(len(defs))], dtype=object)
+
+    to_drop = generator.get_defs_to_drop(defs)
+
+    assert to_drop.index.equals(defs.index)
+    assert to_drop.tolist() == [baseline_to_drop(t) for t in defs]
+    assert 0 < to_drop.sum() < len(defs)
+
+
+def test_seeded_generation_does_not_depend_on_workers(word_index):
+    df_puns = pd.DataFrame({'id': range(1, 9), 'solution': ['stair', 'rates', 'tears', 'nets'] * 2})
+
+    outputs = [
+        generator.generate_all_hints(
+            df_puns, max_workers=max_workers, word_index=word_index,
+            rank_index=word_index, seed=0
+            )
+        for max_workers in (1, 4)
+        ]
+
+    pd.testing.assert_frame_equal(outputs[0], outputs[1])
+    assert set(outputs[0]['master_id']) == set(df_puns['id'])
+    # each pun gets its own draws
+    assert outputs[0][outputs[0]['master_id'] == 1]['word'].tolist() != \
+        outputs[0][outputs[0]['master_id'] == 5]['word'].tolist()
@@ -0,0 +1,96 @@
+import time
+from http.server import BaseHTTPRequestHandler
+from io import BytesIO
+
+import pytest
+import requests
+from PIL import Image
+
+from jumble.images import ImageCache
+
+
+class ImageStub(BaseHTTPRequestHandler):
+    """Serve a 600x400 png at any path, `/missing` and `/hang` aside"""
+
+    # keep connections open, as a real image server would
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.requests.append((self.client_address, self.path))
+        if self.path == '/missing':
+            body = b'not found'
+            self.send_response(404)
+        else:
+            if self.path == '/hang':
+                time.sleep(0.5)
+            buffer = BytesIO()
+            Image.new('RGB', (600, 400), color='red').save(buffer, format='PNG')
+            body = buffer.getvalue()
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except OSError:
+            # the client gave up waiting
+            pass
+
+
+@pytest.fixture
+def image_server(stub_server):
+    return stub_server(ImageStub)
+
+
+def test_image_is_resized_and_cached_in_memory(image_server, tmp_path):
+    cache = ImageCache(cache_dir=str(tmp_path / 'images'))
+
+    image = cache.get(f'{image_server.url}/a.png')
+    assert image.size == (300, 200)
+
+    assert cache.get(f'{image_server.url}/a.png') is image
+    assert len(image_server.requests) == 1
+
+
+def test_image_is_cached_on_disk(image_server, tmp_path):
+    cache_dir = tmp_path / 'images'
+    ImageCache(cache_dir=str(cache_dir)).get(f'{image_server.url}/a.png')
+
+    # a new process starts with an empty memory cache
+    image = ImageCache(cache_dir=str(cache_dir)).get(f'{image_server.url}/a.png')
+
+    assert image.size == (300, 200)
+    assert len(image_server.requests) == 1
+    assert len(list(cache_dir.glob('*.png'))) == 1
+
+
+def test_cache_dir_is_created_on_first_save(image_server, tmp_path):
+    cache_dir = tmp_path / 'images'
+    cache = ImageCache(cache_dir=str(cache_dir))
+    assert not cache_dir.exists()
+
+    cache.get(f'{image_server.url}/a.png')
+
+    assert cache_dir.is_dir()
+
+
+def test_connections_are_reused(image_server):
+    cache = ImageCache(cache_dir=None)
+
+    for name in ('a', 'b', 'c'):
+        cache.get(f'{image_server.url}/{name}.png')
+
+    assert len(image_server.requests) == 3
+    assert len({client for client, _ in image_server.requests}) == 1
+
+
+def test_download_errors(image_server):
+    cache = ImageCache(cache_dir=None, timeout=0.1)
+
+    with pytest.raises(requests.HTTPError):
+        cache.get(f'{image_server.url}/missing')
+    with pytest.raises(requests.Timeout):
+        cache.get(f'{image_server.url}/hang')
@@ -0,0 +1,146 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from jumble import crud, models, populator
+
+
+def make_master_word(i: int, n_jumbles: int, n_options: int) -> dict:
+    """Master word record whose option words tell where they belong"""
+    return {
+        # clues are not in id order
+        'to_complete': f'{9 - i} clue ---',
+        'solution': f'solution {i}',
+        'dialogue': '',
+        'image_url': '',
+        'jumbles': [
+            [
+                {
+                    'word': f'm{i}j{j}o{k}', 'score': k, 'defs': None,
+                    'level': 'Difficult', 'placeholder': '?o'
+                }
+                for k in range(n_options)
+                ]
+            for j in range(n_jumbles)
+            ]
+        }
+
+
+def read_jumble_words(db, master_word_id: int) -> list:
+    """Option words of each jumble of a master word, in jumble id order"""
+    jumbles = db.execute(
+        select(models.Jumble).where(models.Jumble.master_word_id == master_word_id)
+        .order_by(models.Jumble.id)
+        ).scalars().all()
+    return [sorted(t.word for t in jumble.jumble_options) for jumble in jumbles]
+
+
+def test_bulk_create_links_jumbles_and_options_across_batches(empty_db):
+    # rows already in db, so that new ids don't start at 1
+    crud.bulk_create_master_words(empty_db, master_words=[make_master_word(9, 2, 2)])
+    master_words = [
+        make_master_word(i, n_jumbles=i % 4, n_options=1 + i % 3) for i in range(7)
+        ]
+
+    ids = crud.bulk_create_master_words(empty_db, master_words=master_words, batch_size=3)
+
+    assert len(set(ids)) == len(master_words)
+    for master_word_id, master_word in zip(ids, master_words):
+        assert empty_db.get(models.MasterWord, master_word_id).solution == master_word['solution']
+        assert read_jumble_words(empty_db, master_word_id) == [
+            sorted(t['word'] for t in jumble) for jumble in master_word['jumbles']
+            ]
+
+
+def make_dataset(n_masters: int = 5):
+    """Master words and their options, sorted by master id"""
+    df_masters = pd.DataFrame({
+        'id': range(1, n_masters + 1),
+        'to_complete': [f'clue {i} ---' for i in range(n_masters)],
+        'solution': [f'solution {i}' for i in range(n_masters)],
+        'dialogue': '',
+        'image_url': ''
+        })
+    df_options = pd.DataFrame([
+        {
+            'word': f'm{i}h{hint}o{k}', 'score': k, 'defs': ['n\tsome definition'],
+            'level': 'Tough nut to crack', 'placeholder': '?o??', 'hint': hint,
+            'master_id': i
+            }
+        for i in range(1, n_masters + 1)
+        for hint in range(1, 1 + i % 3)
+        for k in range(3)
+        ])
+    return df_masters, df_options
+
+
+def chunks(df, chunk_size: int):
+    return [df.iloc[i:i + chunk_size] for i in range(0, len(df), chunk_size)]
+
+
+def read_master_words(db) -> dict:
+    """Option words of each jumble, per master word solution"""
+    return {
+        t.solution: read_jumble_words(db, t.id)
+        for t in db.execute(select(models.MasterWord)).scalars()
+        }
+
+
+def test_option_groups_stay_whole_across_chunks():
+    _, df_options = make_dataset()
+
+    groups = dict(populator.iter_jumble_option_groups(chunks(df_options, 2)))
+
+    assert groups == populator.group_jumble_options(df_options)
+
+
+def test_unsorted_options_cannot_be_streamed():
+    _, df_options = make_dataset()
+
+    with pytest.raises(ValueError):
+        list(populator.iter_jumble_option_groups(chunks(df_options[::-1], 4)))
+
+
+def test_options_without_master_word_are_skipped():
+    df_masters, df_options = make_dataset()
+    option_groups = populator.group_jumble_options(df_options).items()
+
+    records = list(populator.iter_master_word_records(
+        chunks(df_masters[df_masters['id'] != 2], 2), option_groups=option_groups
+        ))
+
+    assert [t['solution'] for t in records] == ['solution 0', 'solution 2', 'solution 3', 'solution 4']
+    assert [len(t['jumbles']) for t in records] == [1, 0, 1, 2]
+
+
+def test_streamed_load_matches_bulk_load(tmp_path, empty_db):
+    df_masters, df_options = make_dataset()
+    engine = create_engine(f"sqlite:///{tmp_path / 'bulk.db'}")
+    models.Base.metadata.create_all(engine)
+
+    with Session(engine) as db:
+        populator.bulk_create_master_words(df_masters, df_options, db=db)
+        expected = read_master_words(db)
+    engine.dispose()
+    populator.stream_create_master_words(
+        chunks(df_masters, 2), chunks(df_options, 3), db=empty_db, batch_size=2
+        )
+
+    assert read_master_words(empty_db) == expected
+    assert len(expected) == 5
+
+
+def test_second_populator_run_inserts_nothing(empty_db):
+    df_masters, df_options = make_dataset()
+
+    first = populator.bulk_create_master_words(df_masters, df_options, db=empty_db)
+    second = populator.bulk_create_master_words(df_masters, df_options, db=empty_db)
+    streamed = populator.stream_create_master_words(
+        chunks(df_masters, 2), chunks(df_options, 3), db=empty_db, batch_size=2
+        )
+
+    assert len(first) == 5
+    assert second == []
+    assert streamed == []
+    assert len(read_master_words(empty_db)) == 5
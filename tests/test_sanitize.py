@@ -0,0 +1,43 @@
+from pathlib import Path
+
+import pytest
+
+from jumble import generator
+from jumble.datasets import load_hints
+
+DATA_DIR = Path(__file__).parents[1] / 'data'
+
+
+@pytest.fixture(scope='module')
+def df_hints():
+    return load_hints(DATA_DIR / 'hints.csv')
+
+
+def assert_same_as_row_wise(df_hints):
+    expected = df_hints.apply(generator.sanitize_hints, axis=1)
+    sanitized = generator.sanitize_all_hints(df_hints)
+
+    assert sanitized.index.equals(expected.index)
+    assert sanitized.tolist() == expected.tolist()
+    return sanitized
+
+
+def test_sanitize_all_hints_matches_row_wise_sanitize(df_hints):
+    assert_same_as_row_wise(df_hints)
+
+
+def test_sanitize_all_hints_masks_like_row_wise_sanitize(df_hints):
+    # the saved defs are already sanitized, mention the hint words again
+    df_hints = df_hints.assign(defs=[
+        defs + [f'v\t{word}ing, {word.capitalize()}s or ({word}ed)']
+        for word, defs in zip(df_hints['word'], df_hints['defs'])
+        ])
+
+    sanitized = assert_same_as_row_wise(df_hints)
+
+    # words with accents or non letters are only partly masked, as before
+    assert all(
+        '?' in defs.split('\n')[-1]
+        for word, defs in zip(df_hints['word'], sanitized)
+        if word.isascii() and word.isalpha()
+        )